@@ -1,23 +1,29 @@
 import React, { useEffect, useState } from "react";
 import "./BoardDisplay.css";
 import { BootstrapTheme } from "../controls/ThemeSelector";
-import { fetchGraphdag } from "../../services/connector";
-import { ProcessedEdge } from "../../types/visualization";
+import { fetchGraphdagForPosition } from "../../services/connector";
 
 interface GraphDagViewProps {
-  edges: ProcessedEdge[];
+  fen: string;
+  layers?: string;
+  edgeTypes?: string[];
   theme: BootstrapTheme;
 }
 
-const GraphDagView: React.FC<GraphDagViewProps> = ({ edges, theme }) => {
+const GraphDagView: React.FC<GraphDagViewProps> = ({
+  fen,
+  layers = "all",
+  edgeTypes = [],
+  theme,
+}) => {
   const [asciiArt, setAsciiArt] = useState<string>("");
   const [loading, setLoading] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
     const fetchData = async () => {
-      if (!edges || edges.length === 0) {
-        setAsciiArt("No edges to display");
+      if (!fen) {
+        setAsciiArt("No position to display");
         return;
       }
 
@@ -25,7 +31,7 @@ const GraphDagView: React.FC<GraphDagViewProps> = ({ edges, theme }) => {
       setError(null);
 
       try {
-        const response = await fetchGraphdag(edges);
+        const response = await fetchGraphdagForPosition(fen, layers, edgeTypes);
         if (response && response.ascii_art) {
           setAsciiArt(response.ascii_art);
         } else if (response && response.error) {
@@ -43,7 +49,9 @@ const GraphDagView: React.FC<GraphDagViewProps> = ({ edges, theme }) => {
     };
 
     fetchData();
-  }, [edges]);
+    // edgeTypes is compared by value so a fresh array with the same types does not refetch
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [fen, layers, edgeTypes.join(",")]);
 
   if (loading) {
     return (
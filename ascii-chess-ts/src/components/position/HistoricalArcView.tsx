@@ -5,7 +5,7 @@ import { RootState } from "../../app/store";
 import { ChessGame } from "../../chess/chessGame";
 import { LinksResponse, ProcessedEdge } from "../../types/visualization";
 import { PieceDisplayMode } from "../../types/chess";
-import { fetchConnections } from "../../services/connector";
+import { fetchConnectionsBatch } from "../../services/connector";
 import { useMoveHistory } from "../../hooks/useMoveHistory";
 import { getPieceDisplay } from "../../utils/chessDisplay";
 
@@ -40,9 +40,12 @@ const HistoricalArcView: React.FC<HistoricalArcViewProps> = ({
   useEffect(() => {
     const fetchHistoricalData = async () => {
       try {
-        const historicalDataPromises = fenHistory.map(async (fen) => {
-          // Use unified endpoint for links layer
-          const fetchedLinks = await fetchConnections(fen, "links");
+        // One batched request for the whole game instead of one per position
+        const fetchedPositions = await fetchConnectionsBatch(fenHistory, "links");
+        const data = fetchedPositions.map((fetchedLinks: any) => {
+          if (!fetchedLinks.edges) {
+            return { linksData: null, processedEdges: [] };
+          }
           const edges = fetchedLinks.edges.map((edge: any) => ({
             source:
               typeof edge.source === "string"
@@ -60,7 +63,6 @@ const HistoricalArcView: React.FC<HistoricalArcViewProps> = ({
           };
         });
 
-        const data = await Promise.all(historicalDataPromises);
         setHistoricalData(data);
       } catch (error) {
         console.error("Error fetching historical data:", error);
@@ -37,6 +37,62 @@ export const fetchConnections = async (
   }
 };
 
+/**
+ * Batch variant of fetchConnections for many positions in one API call.
+ *
+ * @param fens - FEN strings to analyse; repeated positions are computed once
+ * @param layers - Comma-separated layer names, 'all', or 'none' (default: 'all')
+ * @param heatmap - Include heatmap data (attack counts per square)
+ * @returns One result per FEN, in order; invalid FENs yield an object with an 'error' field
+ */
+export const fetchConnectionsBatch = async (
+  fens: string[],
+  layers: string = "all",
+  heatmap: boolean = false
+) => {
+  try {
+    const url = `${apiBaseUrl}/connections/batch`;
+    const response = await axios.post(url, { fens, layers, heatmap });
+    return response.data.results;
+  } catch (error) {
+    console.error("Error fetching connections batch:", error);
+    throw error;
+  }
+};
+
+/**
+ * GraphDAG ASCII art for a position, with the edges computed server-side.
+ * Responses carry an ETag and Cache-Control, so the browser revalidates a
+ * repeated position instead of downloading it again.
+ *
+ * @param inputString - FEN string representing the board state
+ * @param layers - Comma-separated layer names, 'all', or 'none' (default: 'all')
+ * @param edgeTypes - Edge types to keep (e.g. ['threat', 'protection']); all when empty
+ * @param renderer - 'diagon' or 'python'; the server default when omitted
+ * @returns Object with 'ascii_art', or with 'error' if it could not be drawn
+ */
+export const fetchGraphdagForPosition = async (
+  inputString: string,
+  layers: string = "all",
+  edgeTypes: string[] = [],
+  renderer?: "diagon" | "python"
+) => {
+  try {
+    let url = `${apiBaseUrl}/graphdag?fen_string=${encodeURIComponent(inputString)}&layers=${layers}`;
+    if (edgeTypes.length > 0) {
+      url += `&edge_types=${edgeTypes.join(",")}`;
+    }
+    if (renderer) {
+      url += `&renderer=${renderer}`;
+    }
+    const response = await axios.get(url);
+    return response.data;
+  } catch (error) {
+    console.error("Error fetching graphdag:", error);
+    throw error;
+  }
+};
+
 export const fetchGraphdag = async (edges: any[]) => {
   try {
     const url = `${apiBaseUrl}/graphdag`;
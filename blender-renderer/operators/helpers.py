@@ -3,6 +3,7 @@
 import json
 
 from ..services.connector_service import ConnectorService
+from ..services.connector_wire import columnar_layer_edges, columnar_rows
 from ..utils import (
     anim_targets,
     clear_scene,
@@ -54,45 +55,27 @@ def render_current_fen(operator, context):
         layers_param = ",".join(sorted(enabled_layer_types))
         operator.report({"INFO"}, f"Fetching layers: {layers_param}")
 
-    data = connector_service.fetch_connections(props.fen_string, layers=layers_param)
-    all_edges = data.get("edges", [])
+    data = connector_service.fetch_connections_columnar(
+        props.fen_string, layers=layers_param
+    )
+    if "error" in data:
+        # Leave the current scene in place rather than clearing it for nothing
+        operator.report({"ERROR"}, f"Connector error: {data['error']}")
+        return False, data
 
     operator.report({"INFO"}, "Clearing scene...")
     clear_scene()
 
     global_config = config.get("global", {})
-    nodes = data.get("nodes", [])
+    nodes = columnar_rows(data.get("nodes", {}))
 
-    # Render each layer, filtering edges by type
+    # Render each layer; edges arrive already grouped by layer
     for layer in layers:
         if not layer.get("enabled", False):
             continue
 
-        layer_type = layer.get("type")
-
-        # Filter edges for this specific layer type
-        if layer_type == "adjacencies":
-            layer_edges = [e for e in all_edges if e.get("type") == "adjacency"]
-        elif layer_type == "links":
-            # Links layer shows threat and protection edges
-            layer_edges = [
-                e for e in all_edges if e.get("type") in {"threat", "protection"}
-            ]
-        elif layer_type == "king_box":
-            # King box shows king movement and blocking edges
-            layer_edges = [
-                e for e in all_edges if e.get("type", "").startswith("king_")
-            ]
-        elif layer_type == "shadows":
-            # Shadows show caster and shadow edges
-            layer_edges = [
-                e
-                for e in all_edges
-                if "caster_" in e.get("type", "") or "shadow_" in e.get("type", "")
-            ]
-        else:
-            # Other layers (usd, ascii, focus) don't use edges
-            layer_edges = []
+        # Other layers (usd, ascii, focus) don't use edges
+        layer_edges = columnar_layer_edges(data, layer.get("type"))
 
         render_layer(layer, global_config, nodes, edges=layer_edges)
 
@@ -1,8 +1,18 @@
 """Service layer for connector API communication"""
 
+import json
 import os
 import requests
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from .connector_wire import BINARY_MEDIA_TYPE, decode_graph
+
+RESPONSE_CACHE_SIZE = 256
+
+# Response caches by base URL; module level because operators build a new
+# ConnectorService for every render
+_response_caches: Dict[str, "OrderedDict[Tuple, Dict[str, Any]]"] = {}
 
 
 class ConnectorService:
@@ -20,8 +30,53 @@ class ConnectorService:
         if base_url is None:
             base_url = os.getenv("CONNECTOR_URL", "http://localhost:8000")
         self.base_url = base_url.rstrip("/")
+        # Position responses never change for a given request, so keep recent
+        # ones and revalidate (or, when marked immutable, simply reuse) them
+        self._responses = _response_caches.setdefault(self.base_url, OrderedDict())
+
+    def _get(
+        self, url: str, params: Dict[str, str], headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[bytes, str]:
+        """
+        GET through the response cache.
+
+        Args:
+            url: Endpoint URL
+            params: Query parameters
+            headers: Extra request headers (part of the cache key)
+
+        Returns:
+            Tuple of response body and content type
+        """
+        headers = dict(headers or {})
+        key = (url, tuple(sorted(params.items())), tuple(sorted(headers.items())))
+        cached = self._responses.get(key)
+        if cached is not None:
+            self._responses.move_to_end(key)
+            if cached["immutable"]:
+                return cached["content"], cached["content_type"]
+            headers["If-None-Match"] = cached["etag"]
+        response = requests.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return cached["content"], cached["content_type"]
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "")
+        etag = response.headers.get("ETag")
+        if etag:
+            cache_control = response.headers.get("Cache-Control", "")
+            self._responses[key] = {
+                "etag": etag,
+                "immutable": "immutable" in cache_control,
+                "content": response.content,
+                "content_type": content_type,
+            }
+            if len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return response.content, content_type
 
-    def fetch_connections(self, fen_string: str, layers: str = "all") -> Dict[str, Any]:
+    def fetch_connections(
+        self, fen_string: str, layers: str = "all", binary: bool = False
+    ) -> Dict[str, Any]:
         """
         Fetch position data with all requested layer types in a single call.
 
@@ -33,16 +88,39 @@ class ConnectorService:
             fen_string: FEN notation of the chess position
             layers: Comma-separated layer names or 'all' (default)
                    e.g., "adjacencies,links,king_box,shadows"
+            binary: Request the compact binary encoding and decode it locally;
+                    the result is the same as for the JSON response
 
         Returns:
             Dict containing 'nodes' and 'edges' where edges have 'type' field
         """
         url = f"{self.base_url}/connections"
-        response = requests.get(
-            url, params={"fen_string": fen_string, "layers": layers}
-        )
-        response.raise_for_status()
-        return response.json()
+        params = {"fen_string": fen_string, "layers": layers}
+        headers = {"Accept": BINARY_MEDIA_TYPE} if binary else {}
+        content, content_type = self._get(url, params, headers)
+        if content_type.startswith(BINARY_MEDIA_TYPE):
+            return decode_graph(content)
+        return json.loads(content)
+
+    def fetch_connections_columnar(
+        self, fen_string: str, layers: str = "all"
+    ) -> Dict[str, Any]:
+        """
+        Fetch position data as parallel arrays, grouped by layer.
+
+        Args:
+            fen_string: FEN notation of the chess position
+            layers: Comma-separated layer names or 'all' (default)
+
+        Returns:
+            Dict with 'nodes' (one array per node field), 'edge_types' and
+            'layers' mapping each requested layer to 'source', 'target' and
+            'type_code' arrays; see connector_wire.columnar_layer_edges
+        """
+        url = f"{self.base_url}/connections"
+        params = {"fen_string": fen_string, "layers": layers, "format": "columnar"}
+        content, _ = self._get(url, params)
+        return json.loads(content)
 
     def fetch_diff(self, from_fen: str, to_fen: str) -> list:
         """
@@ -56,6 +134,5 @@ class ConnectorService:
             List of dicts with 'from_square' and 'to_square' keys
         """
         url = f"{self.base_url}/diff"
-        response = requests.get(url, params={"from_fen": from_fen, "to_fen": to_fen})
-        response.raise_for_status()
-        return response.json().get("moves", [])
+        content, _ = self._get(url, {"from_fen": from_fen, "to_fen": to_fen})
+        return json.loads(content).get("moves", [])
@@ -0,0 +1,111 @@
+"""Decoders for the connector's binary and columnar /connections formats"""
+
+import struct
+from typing import Any, Dict, List
+
+# Must match connector/wire.py; both tables are append-only
+BINARY_MEDIA_TYPE = "application/vnd.connector.graph"
+MAGIC = b"CG"
+VERSION = 1
+FLAG_HEATMAP = 1
+HEADER = struct.Struct("<2sBBHH")
+
+EDGE_TYPES = (
+    "adjacency",
+    "threat",
+    "protection",
+    "king_can_move",
+    "king_blocked_ally",
+    "king_blocked_threat",
+    "caster_threat",
+    "caster_protection",
+    "shadow_threat",
+    "shadow_protection",
+)
+PIECE_SYMBOLS = "PNBRQKpnbrqk"
+PHANTOM = len(PIECE_SYMBOLS) + 1
+
+SQUARE_NAMES = [file + rank for rank in "12345678" for file in "abcdefgh"]
+PIECES = [(None, None)] + [
+    (symbol, "white" if symbol.isupper() else "black") for symbol in PIECE_SYMBOLS
+]
+PIECES.append(("phantom", "phantom"))
+
+
+def decode_graph(payload: bytes) -> Dict[str, Any]:
+    """
+    Unpack a binary /connections payload.
+
+    Args:
+        payload: Response body sent with the BINARY_MEDIA_TYPE content type
+
+    Returns:
+        Dict with 'nodes' and 'edges', identical to the JSON response
+    """
+    magic, version, flags, node_count, edge_count = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported payload: magic={magic!r} version={version}")
+    heatmap = flags & FLAG_HEATMAP
+    offset = HEADER.size
+    nodes = []
+    stride = 4 if heatmap else 2
+    for i in range(offset, offset + node_count * stride, stride):
+        piece_code = payload[i + 1]
+        piece_type, color = PIECES[piece_code]
+        node = {
+            "square": SQUARE_NAMES[payload[i]],
+            "piece_type": piece_type,
+            "color": color,
+        }
+        if heatmap and piece_code != PHANTOM:
+            node["hw"] = payload[i + 2]
+            node["hb"] = payload[i + 3]
+        nodes.append(node)
+    offset += node_count * stride
+    edges = [
+        {
+            "type": EDGE_TYPES[payload[i]],
+            "source": SQUARE_NAMES[payload[i + 1]],
+            "target": SQUARE_NAMES[payload[i + 2]],
+        }
+        for i in range(offset, offset + edge_count * 3, 3)
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+def columnar_rows(columns: Dict[str, list]) -> List[Dict[str, Any]]:
+    """
+    Turn parallel arrays back into one dict per row.
+
+    Args:
+        columns: Mapping of field name to equally long value lists
+
+    Returns:
+        List of dicts with one key per field
+    """
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def columnar_layer_edges(data: Dict[str, Any], layer: str) -> List[Dict[str, str]]:
+    """
+    Edges of one layer from a columnar /connections response.
+
+    Args:
+        data: Response fetched with format=columnar
+        layer: Layer name (adjacencies, links, king_box, shadows)
+
+    Returns:
+        List of dicts with 'type', 'source' and 'target' keys; empty if the
+        layer was not requested or the response is an error
+    """
+    columns = data.get("layers", {}).get(layer)
+    if columns is None:
+        return []
+    edge_types = data["edge_types"]
+    return [
+        {"type": edge_types[code], "source": source, "target": target}
+        for source, target, code in zip(
+            columns["source"], columns["target"], columns["type_code"]
+        )
+    ]
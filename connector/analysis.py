@@ -0,0 +1,431 @@
+import os
+import chess
+from collections import Counter
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from attacks import (
+    ATTACK_SOURCES,
+    KING_BOX,
+    RAYS,
+    SQUARE_NAMES,
+    SLIDER_DIRECTIONS,
+    attacked_squares,
+    attackers_by_square,
+    changed_squares,
+    first_two_blockers,
+)
+from cache import LRUCache
+from metrics import timed_layer
+
+LAYERS = ("adjacencies", "links", "king_box", "shadows")
+
+
+def parse_layers(layers: str) -> Set[str]:
+    """
+    Parse the /connections layers query parameter.
+    accepts comma-separated layer names, 'all', or 'none'
+    returns the set of requested layer names
+    """
+    if layers == "all":
+        return set(LAYERS)
+    elif layers == "none" or not layers.strip():
+        return set()
+    else:
+        return set(layer.strip() for layer in layers.split(","))
+
+
+class AnalysisContext:
+    """
+    Board facts shared by every /connections layer, computed once per position.
+    The piece map, occupancy and per-square attacker sets are built on first use,
+    and each layer is a lazily computed property so a request only pays for what it asks.
+    """
+
+    def __init__(self, board: chess.Board):
+        self.board = board
+        self.occupied = board.occupied
+        self.white = board.occupied_co[chess.WHITE]
+        self.black = board.occupied_co[chess.BLACK]
+        self.piece_map = {}
+        for piece_type in chess.PIECE_TYPES:
+            for color in chess.COLORS:
+                piece = chess.Piece(piece_type, color)
+                for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                    self.piece_map[square] = piece
+        # Scratch space for data other modules derive from this position once and
+        # reuse while it stays cached, such as serialize.py's pre-encoded JSON
+        self.derived: Dict[str, Any] = {}
+
+    def color_at(self, square: int) -> chess.Color:
+        return bool(self.white & chess.BB_SQUARES[square])
+
+    @cached_property
+    def attackers(self) -> List[int]:
+        """Bitboard of attackers (either color) for every occupied square."""
+        return attackers_by_square(self.board, self.occupied)
+
+    @cached_property
+    def all_attackers(self) -> List[int]:
+        """Bitboard of attackers (either color) for every square, empty ones included."""
+        empty_attackers = attackers_by_square(self.board, ~self.occupied & chess.BB_ALL)
+        return [
+            self.attackers[square] | empty_attackers[square] for square in chess.SQUARES
+        ]
+
+    @cached_property
+    def nodes(self) -> List[dict]:
+        nodes = []
+        for square in chess.scan_forward(self.occupied):
+            piece = self.piece_map[square]
+            nodes.append(
+                {
+                    "square": SQUARE_NAMES[square],
+                    "piece_type": piece.symbol(),
+                    "color": "white" if piece.color else "black",
+                }
+            )
+        return nodes
+
+    @cached_property
+    @timed_layer("heatmap")
+    def heatmap_nodes(self) -> List[dict]:
+        all_attackers = self.all_attackers
+        nodes = []
+        for square in chess.SQUARES:
+            piece = self.piece_map.get(square)
+            if piece:
+                node = {
+                    "square": SQUARE_NAMES[square],
+                    "piece_type": piece.symbol(),
+                    "color": "white" if piece.color else "black",
+                }
+            else:
+                node = {
+                    "square": SQUARE_NAMES[square],
+                    "piece_type": None,
+                    "color": None,
+                }
+            node["hw"] = chess.popcount(all_attackers[square] & self.white)
+            node["hb"] = chess.popcount(all_attackers[square] & self.black)
+            nodes.append(node)
+        return nodes
+
+    def _adjacency_edges_from(self, square: int, neighbors: int) -> List[dict]:
+        square_name = SQUARE_NAMES[square]
+        return [
+            {
+                "type": "adjacency",
+                "source": square_name,
+                "target": SQUARE_NAMES[adjacent_square],
+            }
+            for adjacent_square in chess.scan_forward(neighbors)
+        ]
+
+    @cached_property
+    @timed_layer("adjacencies")
+    def adjacency_edges(self) -> List[dict]:
+        """Physical adjacency between pieces."""
+        edges = []
+        for square in chess.scan_forward(self.occupied):
+            edges.extend(
+                self._adjacency_edges_from(
+                    square, chess.BB_KING_ATTACKS[square] & self.occupied
+                )
+            )
+        return edges
+
+    def _link_edges_into(self, square: int, sources: int) -> List[dict]:
+        if self.color_at(square):
+            allies, enemies = self.white, self.black
+        else:
+            allies, enemies = self.black, self.white
+        square_name = SQUARE_NAMES[square]
+        edges = []
+
+        for attacker_square in chess.scan_forward(sources & enemies):
+            edges.append(
+                {
+                    "type": "threat",
+                    "source": SQUARE_NAMES[attacker_square],
+                    "target": square_name,
+                }
+            )
+
+        for defender_square in chess.scan_forward(sources & allies):
+            edges.append(
+                {
+                    "type": "protection",
+                    "source": SQUARE_NAMES[defender_square],
+                    "target": square_name,
+                }
+            )
+        return edges
+
+    @cached_property
+    @timed_layer("links")
+    def link_edges(self) -> List[dict]:
+        """Threat and protection edges into every occupied square."""
+        edges = []
+        for square in chess.scan_forward(self.occupied):
+            edges.extend(self._link_edges_into(square, self.attackers[square]))
+        return edges
+
+    @cached_property
+    @timed_layer("king_box")
+    def king_box(self) -> Tuple[List[dict], List[dict]]:
+        """
+        King box edges showing king movement constraints.
+        Returns (edges, phantom_nodes) where phantom_nodes are empty squares king can move to.
+        """
+        edges = []
+        phantom_nodes = []
+
+        # Process both kings
+        for color in [chess.WHITE, chess.BLACK]:
+            king_square = self.board.king(color)
+            if not king_square:
+                continue
+
+            king_square_name = SQUARE_NAMES[king_square]
+            # Enemy attacks with the king lifted off its square, so sliders see through it
+            enemy_attacks = attacked_squares(
+                self.board, not color, self.occupied & ~chess.BB_SQUARES[king_square]
+            )
+            allies = self.white if color else self.black
+            enemies = self.black if color else self.white
+
+            # Check all 8 squares around the king
+            for target_square in KING_BOX[king_square]:
+                target_square_name = SQUARE_NAMES[target_square]
+                target_bb = chess.BB_SQUARES[target_square]
+
+                # Determine edge type based on square status
+                if target_bb & allies:
+                    edge_type = "king_blocked_ally"
+                elif target_bb & (enemies | enemy_attacks):
+                    edge_type = "king_blocked_threat"
+                else:
+                    edge_type = "king_can_move"
+                    # Add phantom node for empty safe squares
+                    phantom_nodes.append(
+                        {
+                            "square": target_square_name,
+                            "piece_type": "phantom",
+                            "color": "phantom",
+                        }
+                    )
+
+                edges.append(
+                    {
+                        "type": edge_type,
+                        "source": king_square_name,
+                        "target": target_square_name,
+                    }
+                )
+
+        return edges, phantom_nodes
+
+    def _shadow_edges_from(self, square: int, directions) -> List[dict]:
+        shadows = []
+        color = self.color_at(square)
+        square_name = SQUARE_NAMES[square]
+
+        for direction in directions:
+            # Need at least 2 pieces in the ray for a shadow connection
+            blockers = first_two_blockers(square, direction, self.occupied)
+            if blockers is None:
+                continue
+            blocker_square, target_square = blockers
+
+            # Caster edge: sliding piece → blocker
+            caster_type = (
+                "caster_protection"
+                if color == self.color_at(blocker_square)
+                else "caster_threat"
+            )
+            shadows.append(
+                {
+                    "source": square_name,
+                    "target": SQUARE_NAMES[blocker_square],
+                    "type": caster_type,
+                }
+            )
+
+            # Shadow edge: blocker → target (represents what would happen if blocker vanished)
+            shadow_type = (
+                "shadow_protection"
+                if color == self.color_at(target_square)
+                else "shadow_threat"
+            )
+            shadows.append(
+                {
+                    "source": SQUARE_NAMES[blocker_square],
+                    "target": SQUARE_NAMES[target_square],
+                    "type": shadow_type,
+                }
+            )
+        return shadows
+
+    @cached_property
+    @timed_layer("shadows")
+    def shadow_edges(self) -> List[dict]:
+        """Caster edges to the first piece on each slider ray, shadow edges to the second."""
+        shadows = []
+        board = self.board
+        for square in chess.scan_forward(board.queens | board.rooks | board.bishops):
+            piece_type = self.piece_map[square].piece_type
+            shadows.extend(
+                self._shadow_edges_from(square, SLIDER_DIRECTIONS[piece_type])
+            )
+        return shadows
+
+    def touched_edges(self, layer: str, changed: int) -> List[dict]:
+        """
+        Edges of one layer that could differ in a position where only the squares
+        in the changed bitboard hold different pieces.
+        Only edges with an endpoint on a changed square, or (for sliders) a ray through
+        one, are built; every other edge is identical on both sides of the change.
+        """
+        edges = []
+        if layer == "adjacencies":
+            for square in chess.scan_forward(self.occupied):
+                neighbors = chess.BB_KING_ATTACKS[square] & self.occupied
+                if not chess.BB_SQUARES[square] & changed:
+                    neighbors &= changed
+                edges.extend(self._adjacency_edges_from(square, neighbors))
+        elif layer == "links":
+            sliders = self.board.queens | self.board.rooks | self.board.bishops
+            for square in chess.scan_forward(self.occupied):
+                sources = self.attackers[square]
+                if not chess.BB_SQUARES[square] & changed:
+                    if not ATTACK_SOURCES[square] & changed:
+                        continue
+                    touched = sources & changed
+                    for source in chess.scan_forward(sources & sliders & ~changed):
+                        if chess.between(source, square) & changed:
+                            touched |= chess.BB_SQUARES[source]
+                    sources = touched
+                edges.extend(self._link_edges_into(square, sources))
+        elif layer == "king_box":
+            # depends on every enemy attack, and is at most 16 edges anyway
+            edges.extend(self.king_box[0])
+        elif layer == "shadows":
+            board = self.board
+            for square in chess.scan_forward(
+                board.queens | board.rooks | board.bishops
+            ):
+                directions = SLIDER_DIRECTIONS[self.piece_map[square].piece_type]
+                if not chess.BB_SQUARES[square] & changed:
+                    directions = [
+                        direction
+                        for direction in directions
+                        if RAYS[square][direction] & changed
+                    ]
+                edges.extend(self._shadow_edges_from(square, directions))
+        return edges
+
+    def layer_edges(self, layer: str) -> List[dict]:
+        if layer == "adjacencies":
+            return self.adjacency_edges
+        elif layer == "links":
+            return self.link_edges
+        elif layer == "king_box":
+            return self.king_box[0]
+        elif layer == "shadows":
+            return self.shadow_edges
+        return []
+
+    def connections(self, requested_layers: Iterable[str], heatmap: bool = False):
+        """
+        Assemble a /connections response body from the requested layers.
+        Returns fresh nodes/edges lists so callers may extend them freely.
+        """
+        requested_layers = set(requested_layers)
+        nodes = list(self.heatmap_nodes if heatmap else self.nodes)
+        edges = []
+        for layer in LAYERS:
+            if layer in requested_layers:
+                edges.extend(self.layer_edges(layer))
+        if "king_box" in requested_layers:
+            nodes.extend(self.king_box[1])
+        return {"nodes": nodes, "edges": edges}
+
+
+def position_key(board: chess.BaseBoard) -> str:
+    """
+    Normalize a position to the part of its FEN the connection layers depend on.
+    Attack graphs only see piece placement, so side to move, castling rights,
+    en passant and the move counters are dropped.
+    """
+    return board.board_fen()
+
+
+# Analyses keyed by position_key; each entry memoizes its layers independently,
+# so a cached layers=all request also serves layers=links for the same position
+context_cache = LRUCache(
+    maxsize=int(os.environ.get("CONNECTIONS_CACHE_SIZE", 512)),
+    ttl=float(os.environ.get("CONNECTIONS_CACHE_TTL", 0)) or None,
+)
+
+
+def get_context(board: chess.Board) -> AnalysisContext:
+    """Return the cached analysis for board's position, building it on a miss."""
+    return context_cache.get_or_create(
+        position_key(board), lambda: AnalysisContext(board.copy(stack=False))
+    )
+
+
+def _edge_key(edge: dict) -> Tuple[str, str, str]:
+    return edge["type"], edge["source"], edge["target"]
+
+
+def _difference(before: List[dict], after: List[dict], key) -> Tuple[list, list]:
+    """Multiset difference of two item lists: (removed, added), each in list order."""
+    remaining = Counter(key(item) for item in after)
+    removed = []
+    for item in before:
+        if remaining[key(item)]:
+            remaining[key(item)] -= 1
+        else:
+            removed.append(item)
+    remaining = Counter(key(item) for item in before)
+    added = []
+    for item in after:
+        if remaining[key(item)]:
+            remaining[key(item)] -= 1
+        else:
+            added.append(item)
+    return removed, added
+
+
+def diff_connections(
+    before: AnalysisContext, after: AnalysisContext, requested_layers: Iterable[str]
+) -> dict:
+    """
+    Patch from one position's connection graph to another's.
+    Only edges touching squares whose contents differ are rebuilt on either side.
+    returns {"nodes": {"added", "removed"}, "edges": {layer: {"added", "removed"}}}
+    """
+    requested_layers = set(requested_layers)
+    changed = changed_squares(before.board, after.board)
+    changed_names = {SQUARE_NAMES[square] for square in chess.scan_forward(changed)}
+
+    before_nodes = [node for node in before.nodes if node["square"] in changed_names]
+    after_nodes = [node for node in after.nodes if node["square"] in changed_names]
+    if "king_box" in requested_layers:
+        before_nodes += before.king_box[1]
+        after_nodes += after.king_box[1]
+    removed_nodes, added_nodes = _difference(
+        before_nodes, after_nodes, lambda node: tuple(node.values())
+    )
+
+    edges = {}
+    for layer in LAYERS:
+        if layer in requested_layers:
+            removed, added = _difference(
+                before.touched_edges(layer, changed),
+                after.touched_edges(layer, changed),
+                _edge_key,
+            )
+            edges[layer] = {"added": added, "removed": removed}
+    return {"nodes": {"added": added_nodes, "removed": removed_nodes}, "edges": edges}
@@ -0,0 +1,166 @@
+import chess
+from typing import List
+
+SQUARE_NAMES = chess.SQUARE_NAMES
+
+
+def attackers_by_square(board: chess.Board, targets: int = chess.BB_ALL) -> List[int]:
+    """
+    Compute the attackers of every square in one pass over python-chess's BB_* tables.
+    accepts a board and a bitboard of target squares (all squares by default)
+    returns a list indexed by square holding the bitboard of pieces (either color)
+    attacking that square; squares outside targets are left as 0
+    """
+    occupied = board.occupied
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    knights = board.knights
+    kings = board.kings
+    white_pawns = board.pawns & white
+    black_pawns = board.pawns & black
+    rooks_queens = board.rooks | board.queens
+    bishops_queens = board.bishops | board.queens
+
+    attackers = [0] * 64
+    for square in chess.scan_forward(targets):
+        attackers[square] = (
+            (chess.BB_KNIGHT_ATTACKS[square] & knights)
+            | (chess.BB_KING_ATTACKS[square] & kings)
+            | (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & white_pawns)
+            | (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & black_pawns)
+            | (
+                chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                & rooks_queens
+            )
+            | (
+                chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied]
+                & rooks_queens
+            )
+            | (
+                chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+                & bishops_queens
+            )
+        )
+    return attackers
+
+
+# ATTACK_SOURCES[square] covers every square whose contents can change the attackers
+# of square: knight jumps plus the full rank, file and diagonals through it
+ATTACK_SOURCES = [
+    chess.BB_KNIGHT_ATTACKS[square]
+    | chess.BB_RANK_ATTACKS[square][0]
+    | chess.BB_FILE_ATTACKS[square][0]
+    | chess.BB_DIAG_ATTACKS[square][0]
+    for square in chess.SQUARES
+]
+
+
+def changed_squares(before: chess.BaseBoard, after: chess.BaseBoard) -> int:
+    """
+    Compare two boards by XOR-ing their piece-type and color bitboards.
+    returns the bitboard of squares whose piece (or emptiness) differs
+    """
+    return (
+        (before.pawns ^ after.pawns)
+        | (before.knights ^ after.knights)
+        | (before.bishops ^ after.bishops)
+        | (before.rooks ^ after.rooks)
+        | (before.queens ^ after.queens)
+        | (before.kings ^ after.kings)
+        | (before.occupied_co[chess.WHITE] ^ after.occupied_co[chess.WHITE])
+        | (before.occupied_co[chess.BLACK] ^ after.occupied_co[chess.BLACK])
+    )
+
+
+def attacked_squares(board: chess.Board, color: chess.Color, occupied: int) -> int:
+    """
+    Compute every square attacked by one side under a given occupancy.
+    accepts a board, the attacking color and the occupancy bitboard sliders should see
+    returns the union of that side's attack bitboards
+    """
+    pieces = board.occupied_co[color]
+    attacked = 0
+    for square in chess.scan_forward(board.knights & pieces):
+        attacked |= chess.BB_KNIGHT_ATTACKS[square]
+    for square in chess.scan_forward(board.kings & pieces):
+        attacked |= chess.BB_KING_ATTACKS[square]
+    for square in chess.scan_forward(board.pawns & pieces):
+        attacked |= chess.BB_PAWN_ATTACKS[color][square]
+    for square in chess.scan_forward((board.rooks | board.queens) & pieces):
+        attacked |= (
+            chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+            | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied]
+        )
+    for square in chess.scan_forward((board.bishops | board.queens) & pieces):
+        attacked |= chess.BB_DIAG_ATTACKS[square][
+            chess.BB_DIAG_MASKS[square] & occupied
+        ]
+    return attacked
+
+
+def _king_box(square: int) -> List[int]:
+    file, rank = chess.square_file(square), chess.square_rank(square)
+    return [
+        chess.square(file + file_offset, rank + rank_offset)
+        for file_offset in [-1, 0, 1]
+        for rank_offset in [-1, 0, 1]
+        if (file_offset, rank_offset) != (0, 0)
+        and 0 <= file + file_offset <= 7
+        and 0 <= rank + rank_offset <= 7
+    ]
+
+
+# KING_BOX[square] lists the squares around square, file by file
+KING_BOX = [_king_box(square) for square in chess.SQUARES]
+
+# (file, rank) steps for sliding pieces, in the order shadow edges are emitted
+ROOK_DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+SLIDER_DIRECTIONS = {
+    chess.QUEEN: QUEEN_DIRECTIONS,
+    chess.ROOK: ROOK_DIRECTIONS,
+    chess.BISHOP: BISHOP_DIRECTIONS,
+}
+
+
+def _ray_mask(square: int, direction) -> int:
+    d_file, d_rank = direction
+    file = chess.square_file(square) + d_file
+    rank = chess.square_rank(square) + d_rank
+    mask = 0
+    while 0 <= file <= 7 and 0 <= rank <= 7:
+        mask |= chess.BB_SQUARES[chess.square(file, rank)]
+        file += d_file
+        rank += d_rank
+    return mask
+
+
+# RAYS[square][direction] is the bitboard of squares strictly beyond square in that
+# direction; a ray walks toward higher square indices exactly when its step is positive
+RAYS = [
+    {direction: _ray_mask(square, direction) for direction in QUEEN_DIRECTIONS}
+    for square in chess.SQUARES
+]
+RAY_ASCENDING = {
+    direction: direction[0] + 8 * direction[1] > 0 for direction in QUEEN_DIRECTIONS
+}
+
+
+def first_two_blockers(square: int, direction, occupied: int):
+    """
+    Find the nearest two occupied squares along a ray.
+    accepts the ray origin, a direction from QUEEN_DIRECTIONS and an occupancy bitboard
+    returns a (blocker, target) pair of squares, or None if fewer than two are occupied
+    """
+    blockers = RAYS[square][direction] & occupied
+    if blockers & (blockers - 1) == 0:
+        return None
+    if RAY_ASCENDING[direction]:
+        first = chess.lsb(blockers)
+        second = chess.lsb(blockers & ~chess.BB_SQUARES[first])
+    else:
+        first = chess.msb(blockers)
+        second = chess.msb(blockers & ~chess.BB_SQUARES[first])
+    return first, second
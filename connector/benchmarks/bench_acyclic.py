@@ -0,0 +1,63 @@
+"""
+Benchmark build_acyclic_graph (online topological order over BitGraph bitmasks)
+against the add/check/remove networkx loop.
+Run from the connector directory: python benchmarks/bench_acyclic.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+import timeit
+
+import chess
+import networkx as nx
+from analysis import LAYERS, AnalysisContext
+from utils import build_acyclic_graph
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "r1b2rk1/2q1bppp/p1nppn2/1p6/3NPP2/2N1B3/PPPQB1PP/2KR3R w - - 0 12",
+    "2q1k3/3n1pp1/2N4p/3p4/Q2Pn3/5N1P/5PPK/8 b - - 9 31",
+]
+
+
+def legacy_build_acyclic_graph(edges):
+    DG = nx.DiGraph()
+    for edge in edges:
+        DG.add_edge(edge["source"], edge["target"])
+        if not nx.is_directed_acyclic_graph(DG):
+            DG.remove_edge(edge["source"], edge["target"])
+    return DG
+
+
+def dense_edges(node_count, edge_count, seed=0):
+    rng = random.Random(seed)
+    nodes = chess.SQUARE_NAMES[:node_count]
+    return [
+        {"source": rng.choice(nodes), "target": rng.choice(nodes)}
+        for _ in range(edge_count)
+    ]
+
+
+def bench(label, edges, number):
+    assert set(build_acyclic_graph(edges).edges()) == set(
+        legacy_build_acyclic_graph(edges).edges
+    )
+    legacy = timeit.timeit(lambda: legacy_build_acyclic_graph(edges), number=number)
+    online = timeit.timeit(lambda: build_acyclic_graph(edges), number=number)
+    print(
+        f"{label:<28} {len(edges):>5} edges  legacy {legacy / number * 1000:8.2f} ms"
+        f"  online {online / number * 1000:7.2f} ms  speedup {legacy / online:6.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    for fen in MIDDLEGAME_FENS:
+        edges = AnalysisContext(chess.Board(fen)).connections(LAYERS)["edges"]
+        bench(f"all layers {fen.split()[0][:14]}", edges, 20)
+    for node_count, edge_count in [(32, 500), (64, 1000), (64, 2000)]:
+        bench(f"random {node_count} nodes", dense_edges(node_count, edge_count), 5)
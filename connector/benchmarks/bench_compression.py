@@ -0,0 +1,91 @@
+"""
+Bytes on the wire and compression CPU per response for each Accept-Encoding
+option the CompressionMiddleware offers, at several gzip levels and brotli
+qualities, over typical connector bodies.
+Run from the connector directory: python benchmarks/bench_compression.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import timeit
+
+import chess
+from analysis import LAYERS, get_context
+from compression import ENCODINGS, Compressor
+from routers.connections import connections_batch_body, connections_game_body
+from routers.diff import diff_body
+from serialize import connections_fragment, dumps
+from wire import encode_graph
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "r1b2rk1/2q1bppp/p1nppn2/1p6/3NPP2/2N1B3/PPPQB1PP/2KR3R w - - 0 12",
+    "2q1k3/3n1pp1/2N4p/3p4/Q2Pn3/5N1P/5PPK/8 b - - 9 31",
+]
+MOVES = "e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3 a6 Be3 e5 Nb3 Be6 f3 Be7".split()
+
+OPTIONS = [("gzip", level, 0) for level in (1, 6, 9)]
+if "br" in ENCODINGS:
+    OPTIONS += [("br", 0, quality) for quality in (1, 4, 6, 11)]
+
+
+def bodies():
+    context = get_context(chess.Board(MIDDLEGAME_FENS[0]))
+    connections = context.connections(LAYERS, True)
+    after = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    full = connections_fragment(context, LAYERS, True)
+    yield "connections links", connections_fragment(context, {"links"}).encode()
+    yield "connections all + heatmap", full.encode()
+    yield "connections binary all", encode_graph(connections, True)
+    yield "diff all layers", dumps(diff_body(chess.STARTING_FEN, after, True, "all"))
+    fens = MIDDLEGAME_FENS * 25
+    yield "batch of 100", dumps(connections_batch_body(fens, "all", False, True))
+    game = connections_game_body(chess.STARTING_FEN, MOVES, None, "all", False, True)
+    yield "game of 16 plies", dumps(game)
+
+
+def ndjson_chunks():
+    game = connections_game_body(chess.STARTING_FEN, MOVES, None, "all", False, True)
+    return [dumps(result) + b"\n" for result in game["results"]]
+
+
+def compress(encoding, level, quality, body):
+    return Compressor(encoding, level, quality).finish(body)
+
+
+def compress_stream(encoding, level, quality, chunks):
+    compressor = Compressor(encoding, level, quality)
+    out = [compressor.flush(chunk) for chunk in chunks]
+    out.append(compressor.finish())
+    return b"".join(out)
+
+
+def report(label, size, run):
+    number = max(3, min(500, int(2_000_000 / max(size, 1))))
+    print(f"{label:<30} {size:>9} B")
+    for encoding, level, quality in OPTIONS:
+        name = f"{encoding}-{level or quality}"
+        compressed = run(encoding, level, quality)
+        seconds = (
+            timeit.timeit(lambda: run(encoding, level, quality), number=number) / number
+        )
+        print(
+            f"  {name:<8} {len(compressed):>9} B  {len(compressed) / size:6.1%}"
+            f"  {seconds * 1000:8.3f} ms CPU"
+        )
+
+
+if __name__ == "__main__":
+    for label, body in bodies():
+        report(label, len(body), lambda e, l, q: compress(e, l, q, body))
+    chunks = ndjson_chunks()
+    size = sum(map(len, chunks))
+    report(
+        "game NDJSON, flushed per line",
+        size,
+        lambda e, l, q: compress_stream(e, l, q, chunks),
+    )
@@ -0,0 +1,56 @@
+"""
+Benchmark /connections layer assembly on one shared AnalysisContext.
+Run from the connector directory: python benchmarks/bench_connections.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import timeit
+
+import chess
+from analysis import AnalysisContext, parse_layers
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "r1b2rk1/2q1bppp/p1nppn2/1p6/3NPP2/2N1B3/PPPQB1PP/2KR3R w - - 0 12",
+]
+
+REQUESTS = [
+    ("links", False),
+    ("adjacencies", False),
+    ("king_box", False),
+    ("shadows", False),
+    ("all", False),
+    ("all", True),
+    ("independent", True),
+]
+
+
+def per_request(board, layers, heatmap):
+    if layers == "independent":
+        # every layer on its own context, as when each layer rescanned the board
+        body = AnalysisContext(board).connections(set(), heatmap)
+        for layer in parse_layers("all"):
+            AnalysisContext(board).connections({layer})
+        return body
+    return AnalysisContext(board).connections(parse_layers(layers), heatmap)
+
+
+if __name__ == "__main__":
+    print(f"{'layers':<14} {'heatmap':<8} {'us/request':>10}")
+    for layers, heatmap in REQUESTS:
+        total = 0.0
+        for fen in MIDDLEGAME_FENS:
+            board = chess.Board(fen)
+            total += min(
+                timeit.repeat(
+                    lambda: per_request(board, layers, heatmap), number=300, repeat=5
+                )
+            )
+        print(
+            f"{layers:<14} {str(heatmap):<8} {total / 300 / len(MIDDLEGAME_FENS) * 1e6:>10.1f}"
+        )
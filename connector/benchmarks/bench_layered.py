@@ -0,0 +1,84 @@
+"""
+Compare the in-process layered renderer with diagon GraphDAG: latency on sample
+DAGs, and fidelity to the diagon drawing in graphdag.txt (start position links).
+Run from the connector directory: python benchmarks/bench_layered.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import shutil
+import subprocess
+import timeit
+
+import chess
+from analysis import LAYERS, AnalysisContext
+from diagon import DIAGON_BINARY, graphdag_input
+from layered import render_layered
+from test_layered import parse_boxes, trace_edges
+from utils import build_acyclic_graph
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+]
+
+
+def dag_edges(fen, layers):
+    context = AnalysisContext(chess.Board(fen))
+    return list(build_acyclic_graph(context.connections(layers)["edges"]).edges())
+
+
+def run_diagon(edges):
+    return subprocess.run(
+        [DIAGON_BINARY, "GraphDAG"],
+        input=graphdag_input(edges),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def fidelity(art, reference):
+    boxes, expected = parse_boxes(art), parse_boxes(reference)
+    rows = lambda parsed: sorted({row for row, _, _ in parsed.values()})
+    layer = lambda parsed, label: rows(parsed).index(parsed[label][0])
+    shared = set(boxes) & set(expected)
+    same_layer = sum(layer(boxes, label) == layer(expected, label) for label in shared)
+    lines, reference_lines = art.split("\n"), reference.rstrip().split("\n")
+    print(
+        f"  nodes drawn        {len(boxes)} (diagon {len(expected)}, shared {len(shared)})"
+    )
+    print(f"  same layer         {same_layer}/{len(shared)}")
+    print(
+        f"  size (rows x cols) {len(lines)} x {max(map(len, lines))}"
+        f" (diagon {len(reference_lines)} x {max(len(line.rstrip()) for line in reference_lines)})"
+    )
+
+
+def bench(label, edges, number=20):
+    seconds = timeit.timeit(lambda: render_layered(edges), number=number) / number
+    line = f"{label:<34} {len(edges):>4} edges  python {seconds * 1000:7.2f} ms"
+    if shutil.which(DIAGON_BINARY):
+        seconds = timeit.timeit(lambda: run_diagon(edges), number=5) / 5
+        line += f"  diagon {seconds * 1000:7.2f} ms"
+    else:
+        line += "  diagon n/a (binary not found)"
+    print(line)
+
+
+if __name__ == "__main__":
+    edges = dag_edges(chess.STARTING_FEN, ["links"])
+    art = render_layered(edges)
+    with open(os.path.join(os.path.dirname(__file__), "..", "graphdag.txt")) as f:
+        reference = f.read()
+    print("fidelity against graphdag.txt")
+    fidelity(art, reference)
+    print(f"  edges traced       {len(trace_edges(art) & set(edges))}/{len(edges)}")
+    print()
+    bench("start position links", edges)
+    bench("start position all layers", dag_edges(chess.STARTING_FEN, LAYERS))
+    for fen in MIDDLEGAME_FENS:
+        bench(f"all layers {fen.split()[0][:20]}", dag_edges(fen, LAYERS))
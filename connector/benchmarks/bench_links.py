@@ -0,0 +1,65 @@
+"""
+Benchmark the `links` layer against the square-by-square board.attackers() scan.
+Run from the connector directory: python benchmarks/bench_links.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import timeit
+
+import chess
+from utils import get_edges
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "r1b2rk1/2q1bppp/p1nppn2/1p6/3NPP2/2N1B3/PPPQB1PP/2KR3R w - - 0 12",
+    "2q1k3/3n1pp1/2N4p/3p4/Q2Pn3/5N1P/5PPK/8 b - - 9 31",
+]
+
+
+def legacy_get_edges(board):
+    edges = []
+    for square in chess.SQUARES:
+        piece = board.piece_at(square)
+        if piece:
+            attackers = board.attackers(not piece.color, square)
+            defenders = board.attackers(piece.color, square)
+            for attacker_square in attackers:
+                edges.append(
+                    {
+                        "type": "threat",
+                        "source": chess.square_name(attacker_square),
+                        "target": chess.square_name(square),
+                    }
+                )
+            for defender_square in defenders:
+                edges.append(
+                    {
+                        "type": "protection",
+                        "source": chess.square_name(defender_square),
+                        "target": chess.square_name(square),
+                    }
+                )
+    return edges
+
+
+def best_of(func, board, number=500, repeat=5):
+    return (
+        min(timeit.repeat(lambda: func(board), number=number, repeat=repeat)) / number
+    )
+
+
+if __name__ == "__main__":
+    print(f"{'position':<68} {'legacy us':>10} {'bitboard us':>12} {'speedup':>8}")
+    for fen in MIDDLEGAME_FENS:
+        board = chess.Board(fen)
+        assert get_edges(board) == legacy_get_edges(board)
+        legacy = best_of(legacy_get_edges, board)
+        current = best_of(get_edges, board)
+        print(
+            f"{fen:<68} {legacy * 1e6:>10.1f} {current * 1e6:>12.1f} {legacy / current:>7.1f}x"
+        )
@@ -0,0 +1,44 @@
+"""
+Cost of recording a metric on the hot path (a histogram observation, a counter
+increment, a timed layer) against an uncached /connections/ analysis, and the
+time to render a scrape.
+Run from the connector directory: python benchmarks/bench_metrics.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import timeit
+
+import chess
+from analysis import AnalysisContext, LAYERS
+from metrics import Counter, Histogram, registry, timed_layer
+
+MIDDLEGAME = "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9"
+
+
+def per_call(func, number=200_000):
+    return timeit.timeit(func, number=number) / number
+
+
+def analyse():
+    AnalysisContext(chess.Board(MIDDLEGAME)).connections(LAYERS, True)
+
+
+if __name__ == "__main__":
+    histogram = Histogram("bench_seconds", "", ("layer",)).labels("links")
+    counter = Counter("bench_total", "", ("executor",)).labels("cpu")
+    noop = timed_layer("bench")(lambda: None)
+    observe = per_call(lambda: histogram.observe(0.003))
+    inc = per_call(counter.inc)
+    timed = per_call(noop) - per_call(lambda: None)
+    analysis = per_call(analyse, number=500)
+    render = per_call(registry.render, number=2000)
+    print(f"histogram observe     {observe * 1e9:8.0f} ns")
+    print(f"counter inc           {inc * 1e9:8.0f} ns")
+    print(f"timed_layer overhead  {timed * 1e9:8.0f} ns")
+    print(f"uncached analysis     {analysis * 1e6:8.0f} us (5 timed layers)")
+    print(f"  metrics share       {5 * timed / analysis:8.2%}")
+    print(f"render /metrics       {render * 1e6:8.0f} us")
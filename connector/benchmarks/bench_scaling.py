@@ -0,0 +1,154 @@
+"""
+Throughput of serve.py from 1 to N workers: each step starts the launcher, drives
+/connections/ with uncached random positions for a fixed time, and reports
+requests per second, latency percentiles, scaling efficiency against one worker
+and the total proportional memory (PSS) of its processes.
+Run from the connector directory:
+    python benchmarks/bench_scaling.py [max_workers] [seconds]
+max_workers defaults to the available CPUs. The load generator shares the
+machine, so leave it a core where possible.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import random
+import socket
+import statistics
+import subprocess
+import time
+
+import chess
+import httpx
+from serve import available_cpus
+
+CONNECTOR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def random_fens(count, seed=7):
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(10, 60)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        fens.append(board.fen())
+    return fens
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def pss_kib(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+async def wait_healthy(client, server):
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if server.poll() is not None:
+            raise RuntimeError("serve.py exited during startup")
+        await asyncio.sleep(0.05)
+
+
+async def drive(client, fens, seconds, concurrency):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    cursor = iter(range(len(fens) * 1000))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            fen = fens[next(cursor) % len(fens)]
+            start = time.perf_counter()
+            response = await client.get(
+                "/connections/", params={"fen_string": fen, "layers": "all"}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+async def measure(workers, fens, seconds):
+    port = free_port()
+    env = dict(os.environ, CONNECTIONS_CACHE_SIZE="16")
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)],
+        cwd=CONNECTOR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_connections=workers * 4)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=30, limits=limits
+        ) as client:
+            await wait_healthy(client, server)
+            await drive(client, fens[:50], 1.0, workers * 4)  # warm the workers
+            latencies, elapsed = await drive(client, fens, seconds, workers * 4)
+        pss = pss_kib(server.pid) + sum(map(pss_kib, children(server.pid)))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "pss": pss,
+    }
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else available_cpus()
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    # Small position cache and many positions, so workers do real analysis
+    fens = random_fens(5000)
+    baseline = None
+    print(
+        f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'eff':>6} {'PSS MiB':>8}"
+    )
+    for workers in range(1, max_workers + 1):
+        result = asyncio.run(measure(workers, fens, seconds))
+        baseline = baseline or result["rps"]
+        efficiency = result["rps"] / (baseline * workers)
+        print(
+            f"{workers:>7} {result['rps']:8.1f} {result['p50'] * 1000:8.1f}"
+            f" {result['p99'] * 1000:8.1f} {efficiency:6.0%}"
+            f" {result['pss'] / 1024:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
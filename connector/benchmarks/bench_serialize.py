@@ -0,0 +1,103 @@
+"""
+Benchmark per-request response serialization: FastAPI's jsonable_encoder +
+JSONResponse render of the body dict, against the bytes the routes now send,
+serialize.dumps over per-position fragments cached on the AnalysisContext.
+"cold" encodes the fragments on every call (first request for a position), "warm"
+reuses them (any later request for it, whatever its layers).
+Run from the connector directory: python benchmarks/bench_serialize.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import timeit
+
+import chess
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from analysis import LAYERS, get_context
+from routers.connections import connections_batch_body, connections_game_body
+from routers.diff import diff_body
+from serialize import connections_fragment, dumps
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "r1b2rk1/2q1bppp/p1nppn2/1p6/3NPP2/2N1B3/PPPQB1PP/2KR3R w - - 0 12",
+    "2q1k3/3n1pp1/2N4p/3p4/Q2Pn3/5N1P/5PPK/8 b - - 9 31",
+]
+
+
+MOVES = "e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3 a6 Be3 e5 Nb3 Be6 f3 Be7".split()
+BOARDS = [chess.Board(fen) for fen in MIDDLEGAME_FENS]
+_game = chess.Board()
+BOARDS.append(_game.copy())
+for _move in MOVES:
+    _game.push_san(_move)
+    BOARDS.append(_game.copy())
+
+
+def fastapi_render(body):
+    return JSONResponse(jsonable_encoder(body)).body
+
+
+def clear_fragments():
+    # Drop the encoded fragments but keep the analyses, so "cold" times only encoding
+    for board in BOARDS:
+        get_context(board).derived.clear()
+
+
+def bench(label, body, encode, number):
+    """encode() must return the same bytes FastAPI would produce for body"""
+    assert encode() == fastapi_render(body)
+    before = timeit.timeit(lambda: fastapi_render(body), number=number) / number
+    cold_time = 0.0
+    for _ in range(number):
+        clear_fragments()
+        start = time.perf_counter()
+        encode()
+        cold_time += time.perf_counter() - start
+    cold_time /= number
+    warm_time = timeit.timeit(encode, number=number) / number
+    print(
+        f"{label:<30} {len(encode()):>7} B  fastapi {before * 1000:7.3f} ms"
+        f"  cold {cold_time * 1000:7.3f} ms  warm {warm_time * 1000:7.3f} ms"
+        f"  ({before / warm_time:5.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    board = chess.Board(MIDDLEGAME_FENS[0])
+    context = get_context(board)
+    for label, layers, heatmap in [
+        ("connections links", {"links"}, False),
+        ("connections all layers", LAYERS, False),
+        ("connections all + heatmap", LAYERS, True),
+    ]:
+        bench(
+            label,
+            context.connections(layers, heatmap),
+            lambda: connections_fragment(context, layers, heatmap).encode(),
+            500,
+        )
+    fens = MIDDLEGAME_FENS * 25
+    bench(
+        "batch of 100, all layers",
+        connections_batch_body(fens, "all", False),
+        lambda: dumps(connections_batch_body(fens, "all", False, encoded=True)),
+        20,
+    )
+    game = (chess.STARTING_FEN, MOVES, None, "all", False)
+    bench(
+        "game of 16 plies, all layers",
+        connections_game_body(*game),
+        lambda: dumps(connections_game_body(*game, encoded=True)),
+        20,
+    )
+    after = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    for label, layers in [("diff", None), ("diff all layers", "all")]:
+        body = diff_body(chess.STARTING_FEN, after, True, layers)
+        bench(label, body, lambda: dumps(body), 500)
@@ -0,0 +1,131 @@
+"""
+Measure connector cold start: import time of main (python -X importtime) with the
+slowest top-level imports, then the time from launching uvicorn until the first
+/health and /connections/ responses, and the worker's RSS once it is serving.
+Run from the connector directory:
+    python benchmarks/bench_startup.py [--max-import-ms N] [--max-first-response-ms N]
+and it exits non-zero when a limit is exceeded, so CI can catch import regressions.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import socket
+import subprocess
+import time
+
+import httpx
+
+CONNECTOR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Modules that serving requests must never import
+HEAVY_MODULES = ("matplotlib", "networkx", "numpy", "chess.pgn")
+
+
+def import_times():
+    """returns (module, cumulative microseconds, depth) for every import of main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=CONNECTOR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((name.strip(), int(cumulative), depth))
+    return times
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_kib(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def first_responses():
+    """returns seconds to the first /health and /connections/ responses, and RSS"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=CONNECTOR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=10) as client:
+            while True:
+                try:
+                    client.get("/health").raise_for_status()
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited during startup")
+                    time.sleep(0.005)
+            health = time.perf_counter() - start
+            client.get(
+                "/connections/", params={"fen_string": "8/8/8/8/8/8/4K3/k7 w - - 0 1"}
+            ).raise_for_status()
+            connections = time.perf_counter() - start
+        rss = rss_kib(server.pid) if sys.platform.startswith("linux") else 0
+    finally:
+        server.terminate()
+        server.wait()
+    return health, connections, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-response-ms", type=float)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    times = import_times()
+    total_ms = next(us for name, us, _ in times if name == "main") / 1000
+    print(f"import main: {total_ms:.0f} ms")
+    top_level = sorted(
+        (entry for entry in times if entry[2] == 1), key=lambda entry: -entry[1]
+    )
+    for name, us, _ in top_level[: args.top]:
+        print(f"  {name:<32} {us / 1000:7.1f} ms")
+    imported = {name for name, _, _ in times}
+    heavy = [module for module in HEAVY_MODULES if module in imported]
+    if heavy:
+        print(f"  heavy modules imported at startup: {', '.join(heavy)}")
+
+    health, connections, rss = first_responses()
+    print(f"first /health response:      {health * 1000:7.0f} ms after launch")
+    print(f"first /connections/ response: {connections * 1000:7.0f} ms after launch")
+    if rss:
+        print(f"worker RSS once serving:     {rss / 1024:7.1f} MiB")
+
+    failed = False
+    if args.max_import_ms is not None and total_ms > args.max_import_ms:
+        print(f"FAIL: import took {total_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+        failed = True
+    limit = args.max_first_response_ms
+    if limit is not None and connections * 1000 > limit:
+        print(f"FAIL: first response took {connections * 1000:.0f} ms > {limit:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare buffered and NDJSON /connections/game responses for long games: time until
+the first byte is ready, total time, and peak traced memory while producing the body.
+The position cache is shrunk to one entry so it does not mask the response itself.
+Run from the connector directory: python benchmarks/bench_stream.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["CONNECTIONS_CACHE_SIZE"] = "1"
+
+import asyncio
+import random
+import time
+import tracemalloc
+
+import chess
+from analysis import parse_layers
+from routers.connections import connections_game_body, game_lines
+from serialize import dumps
+
+
+def random_game(plies, seed=1):
+    rng = random.Random(seed)
+    board = chess.Board()
+    moves = []
+    while len(moves) < plies:
+        if board.is_game_over():
+            board = chess.Board()
+            moves = []
+            continue
+        move = rng.choice(list(board.legal_moves))
+        moves.append(move.uci())
+        board.push(move)
+    return moves
+
+
+def buffered(moves):
+    start = time.perf_counter()
+    body = dumps(
+        connections_game_body(chess.STARTING_FEN, moves, None, "all", False, True)
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, len(body)
+
+
+async def streamed(moves):
+    start = time.perf_counter()
+    first, size = None, 0
+    async for line in game_lines(chess.Board(), moves, parse_layers("all"), False):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(line)
+    return first, time.perf_counter() - start, size
+
+
+def measure(label, run):
+    tracemalloc.start()
+    first, total, size = run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"  {label:<9} first byte {first * 1000:8.1f} ms  total {total * 1000:8.1f} ms"
+        f"  {size / 1024:8.0f} KiB sent  peak {peak / 1024:8.0f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    for plies in (50, 200, 800):
+        moves = random_game(plies)
+        print(f"game of {plies} plies, all layers")
+        measure("buffered", lambda: buffered(moves))
+        measure("ndjson", lambda: asyncio.run(streamed(moves)))
@@ -0,0 +1,80 @@
+"""
+Compare the binary and columnar /connections formats with JSON: payload size (raw
+and gzipped) and encode/decode time per response.
+Run from the connector directory: python benchmarks/bench_wire.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import gzip
+import importlib.util
+import json
+import timeit
+
+import chess
+from analysis import LAYERS, AnalysisContext
+from wire import columnar_body, encode_graph
+
+spec = importlib.util.spec_from_file_location(
+    "connector_wire",
+    os.path.join(
+        os.path.dirname(__file__),
+        "..",
+        "..",
+        "blender-renderer",
+        "services",
+        "connector_wire.py",
+    ),
+)
+connector_wire = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(connector_wire)
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "2q1k3/3n1pp1/2N4p/3p4/Q2Pn3/5N1P/5PPK/8 b - - 9 31",
+]
+
+
+def dumps(body):
+    # The same settings FastAPI's JSONResponse renders with
+    return json.dumps(
+        body, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def per_call_us(func, number=500):
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def bench(label, context, heatmap):
+    body = context.connections(LAYERS, heatmap)
+    text, packed = dumps(body), encode_graph(body, heatmap)
+    columnar = dumps(columnar_body(context, LAYERS, heatmap))
+    assert connector_wire.decode_graph(packed) == body
+    print(
+        f"{label:<26} json {len(text):>6} B (gz {len(gzip.compress(text)):>5})"
+        f"  binary {len(packed):>5} B (gz {len(gzip.compress(packed)):>4})"
+        f"  columnar {len(columnar):>5} B (gz {len(gzip.compress(columnar)):>4})"
+    )
+    print(
+        f"{'':<26} encode json {per_call_us(lambda: dumps(body)):6.1f} us"
+        f"  binary {per_call_us(lambda: encode_graph(body, heatmap)):6.1f} us"
+        f"  columnar {per_call_us(lambda: dumps(columnar_body(context, LAYERS, heatmap))):6.1f} us"
+    )
+    print(
+        f"{'':<26} decode json {per_call_us(lambda: json.loads(text)):6.1f} us"
+        f"  binary {per_call_us(lambda: connector_wire.decode_graph(packed)):6.1f} us"
+        f"  columnar {per_call_us(lambda: json.loads(columnar)):6.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    for fen in [chess.STARTING_FEN, *MIDDLEGAME_FENS]:
+        context = AnalysisContext(chess.Board(fen))
+        for heatmap in (False, True):
+            label = f"{fen.split()[0][:18]}{' heatmap' if heatmap else ''}"
+            bench(label, context, heatmap)
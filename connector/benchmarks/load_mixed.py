@@ -0,0 +1,79 @@
+"""
+Load test: /connections latency with and without large /graphdag requests mixed in.
+Start the server first (uvicorn main:app --port 8000), then run from the connector
+directory: python benchmarks/load_mixed.py [base_url]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+DURATION = 10.0
+CONNECTIONS_CONCURRENCY = 8
+GRAPHDAG_CONCURRENCY = 4
+
+FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "r1b2rk1/2q1bppp/p1nppn2/1p6/3NPP2/2N1B3/PPPQB1PP/2KR3R w - - 0 12",
+]
+
+
+async def connections_worker(client, deadline, latencies, offset):
+    i = offset
+    while time.perf_counter() < deadline:
+        fen = FENS[i % len(FENS)]
+        i += 1
+        start = time.perf_counter()
+        await client.get(
+            "/connections/",
+            params={"fen_string": fen, "layers": "all", "heatmap": True},
+        )
+        latencies.append(time.perf_counter() - start)
+
+
+async def graphdag_worker(client, deadline, edges):
+    while time.perf_counter() < deadline:
+        await client.put("/graphdag", json={"edges": edges}, timeout=60)
+
+
+async def run(with_graphdag):
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60) as client:
+        full = await client.get(
+            "/connections/", params={"fen_string": FENS[2], "layers": "all"}
+        )
+        edges = [
+            {"source": e["source"], "target": e["target"]} for e in full.json()["edges"]
+        ]
+        latencies = []
+        deadline = time.perf_counter() + DURATION
+        tasks = [
+            connections_worker(client, deadline, latencies, offset)
+            for offset in range(CONNECTIONS_CONCURRENCY)
+        ]
+        if with_graphdag:
+            tasks += [
+                graphdag_worker(client, deadline, edges)
+                for _ in range(GRAPHDAG_CONCURRENCY)
+            ]
+        await asyncio.gather(*tasks)
+    latencies.sort()
+    return (
+        len(latencies),
+        statistics.median(latencies) * 1e3,
+        latencies[int(len(latencies) * 0.99) - 1] * 1e3,
+    )
+
+
+if __name__ == "__main__":
+    print(f"{'traffic':<22} {'requests':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, with_graphdag in [
+        ("connections only", False),
+        ("with /graphdag mixed", True),
+    ]:
+        count, p50, p99 = asyncio.run(run(with_graphdag))
+        print(f"{label:<22} {count:>8} {p50:>8.1f} {p99:>8.1f}")
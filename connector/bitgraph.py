@@ -0,0 +1,158 @@
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple
+
+
+def bits(mask: int) -> Iterator[int]:
+    """Yield the indices of the set bits of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+class BitGraph:
+    """
+    Directed graph storing each node's successors and predecessors as integer bitmasks.
+    Sized for board graphs (at most 64 squares, so every mask fits a machine word), but
+    any hashable labels work. Nodes are indexed in order of first appearance, and
+    every query that returns several nodes lists them in that order.
+    """
+
+    def __init__(self, edges: Iterable[Tuple[Hashable, Hashable]] = ()):
+        self.nodes: List[Hashable] = []
+        self.index: Dict[Hashable, int] = {}
+        self.succ: List[int] = []
+        self.pred: List[int] = []
+        for source, target in edges:
+            self.add_edge(source, target)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self.index
+
+    def add_node(self, node: Hashable) -> int:
+        """Add node if it is new; returns its index either way."""
+        index = self.index.get(node)
+        if index is None:
+            index = self.index[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.succ.append(0)
+            self.pred.append(0)
+        return index
+
+    def add_edge(self, source: Hashable, target: Hashable) -> None:
+        u, v = self.add_node(source), self.add_node(target)
+        self.succ[u] |= 1 << v
+        self.pred[v] |= 1 << u
+
+    def remove_edge(self, source: Hashable, target: Hashable) -> None:
+        u, v = self.index[source], self.index[target]
+        self.succ[u] &= ~(1 << v)
+        self.pred[v] &= ~(1 << u)
+
+    def has_edge(self, source: Hashable, target: Hashable) -> bool:
+        u, v = self.index.get(source), self.index.get(target)
+        return u is not None and v is not None and bool(self.succ[u] >> v & 1)
+
+    def labels(self, mask: int) -> List[Hashable]:
+        return [self.nodes[i] for i in bits(mask)]
+
+    def mask(self, nodes: Iterable[Hashable]) -> int:
+        mask = 0
+        for node in nodes:
+            mask |= 1 << self.index[node]
+        return mask
+
+    def successors(self, node: Hashable) -> List[Hashable]:
+        return self.labels(self.succ[self.index[node]])
+
+    def predecessors(self, node: Hashable) -> List[Hashable]:
+        return self.labels(self.pred[self.index[node]])
+
+    def out_degree(self, node: Hashable) -> int:
+        return popcount(self.succ[self.index[node]])
+
+    def in_degree(self, node: Hashable) -> int:
+        return popcount(self.pred[self.index[node]])
+
+    def edges(self) -> Iterator[Tuple[Hashable, Hashable]]:
+        """Yield (source, target) pairs ordered by source, then target, index."""
+        for u, mask in enumerate(self.succ):
+            for v in bits(mask):
+                yield self.nodes[u], self.nodes[v]
+
+    def number_of_edges(self) -> int:
+        return sum(popcount(mask) for mask in self.succ)
+
+    def reachable(self, index: int, within: int = -1, reverse: bool = False) -> int:
+        """
+        Breadth-first search over whole frontiers at a time.
+        accepts a start index, a mask of nodes the search may enter and whether to
+        follow edges backwards
+        returns the mask of nodes reachable from the start, including the start itself
+        """
+        adjacency = self.pred if reverse else self.succ
+        seen = frontier = 1 << index
+        while frontier:
+            step = 0
+            for i in bits(frontier):
+                step |= adjacency[i]
+            frontier = step & within & ~seen
+            seen |= frontier
+        return seen
+
+    def has_path(self, source: Hashable, target: Hashable) -> bool:
+        return bool(self.reachable(self.index[source]) >> self.index[target] & 1)
+
+    def descendants(self, node: Hashable) -> List[Hashable]:
+        index = self.index[node]
+        return self.labels(self.reachable(index) & ~(1 << index))
+
+    def ancestors(self, node: Hashable) -> List[Hashable]:
+        index = self.index[node]
+        return self.labels(self.reachable(index, reverse=True) & ~(1 << index))
+
+    def transitive_closure(self) -> List[int]:
+        """
+        Returns, for every node index, the mask of nodes reachable by a path of one or
+        more edges (a node appears in its own mask only if it lies on a cycle).
+        """
+        closure = list(self.succ)
+        # Warshall's algorithm, one bitmask row at a time
+        for k in range(len(closure)):
+            bit, row = 1 << k, closure[k]
+            for i in range(len(closure)):
+                if closure[i] & bit:
+                    closure[i] |= row
+        return closure
+
+    def topological_sort(self) -> List[Hashable]:
+        """
+        Kahn's algorithm, always taking the lowest-index ready node.
+        Raises ValueError if the graph has a cycle.
+        """
+        remaining = (1 << len(self.nodes)) - 1
+        order = []
+        while remaining:
+            ready = 0
+            for i in bits(remaining):
+                if not self.pred[i] & remaining:
+                    ready = 1 << i
+                    break
+            if not ready:
+                raise ValueError("Graph contains a cycle")
+            remaining ^= ready
+            order.append(self.nodes[ready.bit_length() - 1])
+        return order
+
+    def is_acyclic(self) -> bool:
+        try:
+            self.topological_sort()
+        except ValueError:
+            return False
+        return True
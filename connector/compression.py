@@ -0,0 +1,182 @@
+import os
+import zlib
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone is always available
+    brotli = None
+
+# Bodies smaller than this go out as they are; compressing them saves too few bytes
+# to pay for the CPU and the headers
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+# Brotli's higher qualities are meant for static assets; at 4 it costs about what
+# gzip -6 does and is smaller, by an order of magnitude on batch bodies
+# (benchmarks/bench_compression.py)
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+# Larger bodies are compressed on a worker thread instead of the event loop
+THREAD_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_THREAD_MINIMUM_SIZE", 65536))
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], encodings: Tuple[str, ...] = ENCODINGS
+) -> Optional[str]:
+    """
+    Pick the first of encodings (in server preference order) that the
+    Accept-Encoding header allows; None means send the body uncompressed.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    for encoding in encodings:
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class Compressor:
+    """Incremental gzip or brotli stream; flush() emits everything fed so far."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def flush(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with brotli (when installed) or gzip, as negotiated
+    through Accept-Encoding.
+
+    Complete bodies under minimum_size are left alone. Streamed bodies are
+    compressed chunk by chunk and flushed after each one, so NDJSON records still
+    arrive as they are produced. A compressed response's ETag becomes weak: its
+    bytes differ from the identity representation, and etag_matches already
+    accepts W/ tags in If-None-Match.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+        encodings: Tuple[str, ...] = ENCODINGS,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = encodings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        encoding = negotiate_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+
+    def _compressor(self) -> Compressor:
+        return Compressor(
+            self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+        )
+
+    def _mark_encoded(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            headers = MutableHeaders(raw=list(self.start["headers"]))
+            self.start["headers"] = headers.raw
+            if "content-encoding" in headers or (
+                not more_body and len(body) < self.middleware.minimum_size
+            ):
+                self.passthrough = True
+                await self._send(self.start)
+                await self._send(message)
+                return
+            self._mark_encoded(headers)
+            self.compressor = self._compressor()
+            if not more_body:
+                body = await self._run(self.compressor.finish, body)
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            await self._send(self.start)
+
+        if more_body:
+            chunk = await self._run(self.compressor.flush, body)
+        else:
+            chunk = await self._run(self.compressor.finish, body)
+        await self._send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
+
+    async def _run(self, func, data: bytes) -> bytes:
+        if len(data) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(func, data)
+        return func(data)
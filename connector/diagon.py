@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import os
+import time
+import weakref
+from typing import Iterable, Optional, Tuple
+from cache import LRUCache
+from metrics import diagon_duration
+
+DIAGON_BINARY = os.environ.get("DIAGON_BINARY", "diagon")
+DIAGON_TIMEOUT = float(os.environ.get("DIAGON_TIMEOUT", 10))
+DIAGON_CONCURRENCY = int(os.environ.get("DIAGON_CONCURRENCY", os.cpu_count() or 1))
+DIAGON_QUEUE_TIMEOUT = float(os.environ.get("DIAGON_QUEUE_TIMEOUT", 5))
+
+
+class DiagonError(Exception):
+    """Raised when diagon is missing, fails or runs past its timeout."""
+
+    def __init__(self, message: str, stderr: str = ""):
+        super().__init__(message)
+        self.stderr = stderr
+
+
+class DiagonBusy(Exception):
+    """Raised when no diagon slot frees up within DIAGON_QUEUE_TIMEOUT."""
+
+
+# diagon is a one-shot CLI with no server mode, so rather than keeping workers alive
+# the invocations themselves are capped: at most DIAGON_CONCURRENCY run at once.
+# asyncio semaphores belong to one event loop, hence one per running loop.
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"
+_slots = weakref.WeakKeyDictionary()
+
+# Rendered diagrams keyed by a hash of their diagon input
+diagon_cache = LRUCache(maxsize=int(os.environ.get("DIAGON_CACHE_SIZE", 256)))
+
+
+def _loop_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(DIAGON_CONCURRENCY)
+    return slots
+
+
+async def run_diagon(
+    translator: str,
+    text: str,
+    timeout: Optional[float] = None,
+    queue_timeout: Optional[float] = None,
+) -> str:
+    """
+    Run one diagon translator over text without blocking the event loop.
+    Waits up to queue_timeout for a free slot (DiagonBusy otherwise) and up to timeout
+    for diagon itself (DiagonError otherwise). The child is killed if the wait times
+    out or the calling task is cancelled, e.g. because the client disconnected.
+    returns diagon's stdout
+    """
+    timeout = timeout or DIAGON_TIMEOUT
+    slots = _loop_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), queue_timeout or DIAGON_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise DiagonBusy("diagon is busy, try again shortly")
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                DIAGON_BINARY,
+                translator,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            outcome = "missing"
+            raise DiagonError(f"diagon binary not found: {DIAGON_BINARY}")
+        except OSError as exc:
+            outcome = "unstartable"
+            raise DiagonError(f"diagon could not start: {exc.strerror}")
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(text.encode()), timeout
+            )
+            outcome = "ok" if process.returncode == 0 else "error"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise DiagonError(f"diagon timed out after {timeout:g}s")
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+    finally:
+        slots.release()
+        diagon_duration.labels(outcome).observe(time.perf_counter() - started)
+    if process.returncode != 0:
+        raise DiagonError("Error executing command", stderr.decode())
+    return stdout.decode()
+
+
+def graphdag_input(edges: Iterable[Tuple[str, str]]) -> str:
+    """Format DAG edges as canonical GraphDAG input: sorted "u->v" lines."""
+    return "\n".join(sorted(f"{source}->{target}" for source, target in edges))
+
+
+async def render_graphdag(edges: Iterable[Tuple[str, str]]) -> str:
+    """Render DAG edges with diagon GraphDAG, reusing the diagram of an identical edge set."""
+    text = graphdag_input(edges)
+    key = hashlib.sha256(text.encode()).hexdigest()
+    ascii_art = diagon_cache.get(key)
+    if ascii_art is None:
+        ascii_art = await run_diagon("GraphDAG", text)
+        diagon_cache.put(key, ascii_art)
+    return ascii_art
@@ -0,0 +1,129 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from metrics import executor_rejections, executor_timeouts
+
+
+class ExecutorBusy(Exception):
+    """Raised when the executor already has queue_depth tasks in flight."""
+
+
+class ExecutorTimeout(Exception):
+    """Raised when a task does not finish within its timeout."""
+
+
+def _warm_up() -> None:
+    # Import the analysis modules (and build their lookup tables) in a fresh worker
+    import analysis  # noqa: F401
+    import utils  # noqa: F401
+
+
+class CPUExecutor:
+    """
+    Runs CPU-bound route work off the asyncio event loop.
+    Tasks beyond queue_depth are rejected with ExecutorBusy rather than queued
+    without bound, and every task is awaited for at most timeout seconds.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = os.cpu_count() or 1,
+        queue_depth: int = 32,
+        timeout: float = 10,
+        name: str = "cpu",
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.name = name
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.pending = 0
+        self._pool: Optional[Executor] = None
+
+    @classmethod
+    def from_env(
+        cls, prefix: str, kind: str = "thread", timeout: float = 10, name: str = "cpu"
+    ) -> "CPUExecutor":
+        """
+        Configure an executor from <prefix> (kind: "thread" or "process"),
+        <prefix>_WORKERS, <prefix>_QUEUE_DEPTH and <prefix>_TIMEOUT (seconds).
+        """
+        workers = int(os.environ.get(f"{prefix}_WORKERS", os.cpu_count() or 1))
+        return cls(
+            kind=os.environ.get(prefix, kind),
+            workers=workers,
+            queue_depth=int(os.environ.get(f"{prefix}_QUEUE_DEPTH", workers * 8)),
+            timeout=float(os.environ.get(f"{prefix}_TIMEOUT", timeout)),
+            name=name,
+        )
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="connector-cpu"
+                )
+        return self._pool
+
+    def start(self) -> None:
+        """Create the pool and pre-warm every worker before traffic arrives."""
+        futures = [self.pool.submit(_warm_up) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(
+        self, func: Callable[..., Any], *args, timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Run func(*args) on the pool and await its result.
+        Raises ExecutorBusy when the queue is full and ExecutorTimeout when the task
+        overruns; a timed-out task is abandoned, not interrupted, and keeps its
+        queue slot until it actually finishes.
+        """
+        if self.pending >= self.queue_depth:
+            executor_rejections.labels(self.name).inc()
+            raise ExecutorBusy("Server is busy, try again shortly")
+        loop = asyncio.get_running_loop()
+        work = self.pool.submit(functools.partial(func, *args))
+        self.pending += 1
+        work.add_done_callback(functools.partial(self._release, loop))
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(work), timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            executor_timeouts.labels(self.name).inc()
+            raise ExecutorTimeout("Request took too long to compute")
+
+    def _release(self, loop: asyncio.AbstractEventLoop, work) -> None:
+        # Runs on the pool's thread once the work is done (or cancelled while
+        # still queued), so hand the decrement back to the loop's thread
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:  # the loop has closed; nothing else touches pending
+            self._decrement()
+
+    def _decrement(self) -> None:
+        self.pending -= 1
+
+
+# "thread" keeps the event loop free while work runs; "process" also spreads
+# CPU-bound work across cores, at the cost of pickling arguments and results.
+# /graphdag gets its own lane so slow layouts cannot starve position analysis.
+cpu_executor = CPUExecutor.from_env("CONNECTOR_EXECUTOR")
+graph_executor = CPUExecutor.from_env(
+    "CONNECTOR_GRAPH_EXECUTOR", timeout=30, name="graph"
+)
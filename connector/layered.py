@@ -0,0 +1,300 @@
+import hashlib
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+from bitgraph import BitGraph, bits
+from cache import LRUCache
+
+# Barycenter passes (alternating down and up) tried before keeping the best ordering
+SWEEPS = 12
+
+# U, D, L and R bits of a drawn cell, and the box-drawing character for each mix;
+# where lines cross the vertical one wins, as in diagon's output
+UP, DOWN, LEFT, RIGHT = 1, 2, 4, 8
+LINE_CHARS = {
+    UP: "│",
+    DOWN: "│",
+    UP | DOWN: "│",
+    LEFT: "─",
+    RIGHT: "─",
+    LEFT | RIGHT: "─",
+    DOWN | RIGHT: "┌",
+    DOWN | LEFT: "┐",
+    UP | RIGHT: "└",
+    UP | LEFT: "┘",
+    UP | DOWN | RIGHT: "├",
+    UP | DOWN | LEFT: "┤",
+    DOWN | LEFT | RIGHT: "┬",
+    UP | LEFT | RIGHT: "┴",
+    UP | DOWN | LEFT | RIGHT: "│",
+}
+
+# Rendered diagrams keyed by a hash of their sorted edge list
+layered_cache = LRUCache(maxsize=int(os.environ.get("LAYERED_CACHE_SIZE", 256)))
+
+
+class _Segment:
+    """One wire's hop across a channel, from a pin in the upper layer to one below."""
+
+    def __init__(self, top: int, bottom: int, wire: int):
+        self.top = top
+        self.bottom = bottom
+        self.wire = wire
+        self.has_top = self.has_bottom = True
+        self.after: Optional["_Segment"] = None
+        self.track = -1
+
+    @property
+    def span(self) -> Tuple[int, int]:
+        return min(self.top, self.bottom), max(self.top, self.bottom)
+
+
+def _longest_path_layers(graph: BitGraph) -> List[int]:
+    layer = [0] * len(graph)
+    for node in graph.topological_sort():
+        index = graph.index[node]
+        layer[index] = max((layer[p] + 1 for p in bits(graph.pred[index])), default=0)
+    return layer
+
+
+def _crossings(upper: List[int], lower: List[int], succ: List[List[int]]) -> int:
+    position = {node: i for i, node in enumerate(lower)}
+    # Count inversions among lower endpoints taken in upper order (Fenwick tree)
+    tree = [0] * (len(lower) + 1)
+    crossings = seen = 0
+    for node in upper:
+        targets = sorted(position[target] for target in succ[node])
+        for target in targets:
+            i, not_greater = target + 1, 0
+            while i > 0:
+                not_greater += tree[i]
+                i -= i & -i
+            crossings += seen - not_greater
+        for target in targets:
+            i = target + 1
+            while i <= len(lower):
+                tree[i] += 1
+                i += i & -i
+            seen += 1
+    return crossings
+
+
+def _reorder(layer: List[int], fixed: List[int], neighbours: List[List[int]]) -> None:
+    position = {node: i for i, node in enumerate(fixed)}
+    keys = {}
+    for i, node in enumerate(layer):
+        linked = [position[other] for other in neighbours[node]]
+        keys[node] = sum(linked) / len(linked) if linked else i
+    layer.sort(key=keys.__getitem__)
+
+
+def _order_layers(layers, succ, pred) -> List[List[int]]:
+    """Barycentric crossing reduction; returns the ordering with fewest crossings seen."""
+
+    def total(layers):
+        return sum(
+            _crossings(layers[i], layers[i + 1], succ) for i in range(len(layers) - 1)
+        )
+
+    best, best_crossings = [list(layer) for layer in layers], total(layers)
+    for sweep in range(SWEEPS):
+        if not best_crossings:
+            break
+        if sweep % 2 == 0:
+            for i in range(1, len(layers)):
+                _reorder(layers[i], layers[i - 1], pred)
+        else:
+            for i in range(len(layers) - 2, -1, -1):
+                _reorder(layers[i], layers[i + 1], succ)
+        crossings = total(layers)
+        if crossings < best_crossings:
+            best, best_crossings = [list(layer) for layer in layers], crossings
+    return best
+
+
+def _assign_tracks(segments: List[_Segment], spare_column: int) -> Tuple[int, int]:
+    """
+    Constrained left-edge channel routing: segments sharing a row must not overlap, and
+    a segment leaving the column another one enters must turn on a higher row. Cycles of
+    that constraint are broken by a dogleg through a spare column right of the drawing.
+    returns the number of rows used and the next free spare column
+    """
+    remaining = [segment for segment in segments if segment.top != segment.bottom]
+    by_top = {s.top: s for s in remaining if s.has_top}
+    row = 0
+    while remaining:
+        placed = {id(s) for s in segments if s.track >= 0}
+
+        def ready(segment):
+            above = by_top.get(segment.bottom) if segment.has_bottom else None
+            return (above is None or above is segment or id(above) in placed) and (
+                segment.after is None or id(segment.after) in placed
+            )
+
+        candidates = sorted(
+            (segment for segment in remaining if ready(segment)),
+            key=lambda segment: segment.span,
+        )
+        if not candidates:
+            # Split the leftmost blocked segment in two around the spare column
+            segment = min(remaining, key=lambda segment: segment.span)
+            rest = _Segment(spare_column, segment.bottom, segment.wire)
+            rest.has_top, rest.after = False, segment
+            segment.bottom, segment.has_bottom = spare_column, False
+            segments.insert(segments.index(segment) + 1, rest)
+            remaining.append(rest)
+            spare_column += 1
+            continue
+        right = -1
+        for segment in candidates:
+            left, end = segment.span
+            if left > right:
+                segment.track = row
+                remaining.remove(segment)
+                right = end
+        row += 1
+    return row, spare_column
+
+
+def render_layered(edges: Iterable[Tuple[str, str]]) -> str:
+    """
+    Draw a DAG as layered ASCII art in the style of diagon's GraphDAG.
+    accepts (source, target) pairs of an acyclic graph
+    returns the drawing as box-drawing text (empty if there are no edges)
+    Layers are longest paths from the sources, long edges are threaded through dummy
+    nodes, and each layer is ordered by barycenter sweeps to limit crossings.
+    """
+    graph = BitGraph(edges)
+    if not len(graph):
+        return ""
+    rank = _longest_path_layers(graph)
+
+    # Nodes 0..n-1 are real; dummies appended after them carry edges across layers
+    labels: List[Optional[str]] = list(graph.nodes)
+    node_layer = list(rank)
+    succ: List[List[int]] = [[] for _ in labels]
+    pred: List[List[int]] = [[] for _ in labels]
+    wires: List[List[int]] = []
+    for u, mask in enumerate(graph.succ):
+        for v in bits(mask):
+            wire = [u]
+            for layer in range(rank[u] + 1, rank[v]):
+                labels.append(None)
+                node_layer.append(layer)
+                succ.append([])
+                pred.append([])
+                wire.append(len(labels) - 1)
+            wire.append(v)
+            for a, b in zip(wire, wire[1:]):
+                succ[a].append(b)
+                pred[b].append(a)
+            wires.append(wire)
+
+    layers: List[List[int]] = [[] for _ in range(max(rank) + 1)]
+    for node, layer in enumerate(node_layer):
+        layers[layer].append(node)
+    layers = _order_layers(layers, succ, pred)
+
+    # Boxes are as wide as their label or their port count; dummies are one column
+    width = [
+        1 if label is None else max(len(label), len(succ[n]), len(pred[n])) + 2
+        for n, label in enumerate(labels)
+    ]
+    x = [0] * len(labels)
+    for layer in layers:
+        column = 0
+        for node in layer:
+            x[node] = column
+            column += width[node]
+    canvas_width = max(x[layer[-1]] + width[layer[-1]] for layer in layers)
+
+    # Ports are handed out left to right in the order of the node at the other end
+    out_port: Dict[Tuple[int, int], int] = {}
+    in_port: Dict[Tuple[int, int], int] = {}
+    for node, label in enumerate(labels):
+        offset = 0 if label is None else 1
+        for i, target in enumerate(sorted(succ[node], key=x.__getitem__)):
+            out_port[node, target] = x[node] + offset + i
+        for i, source in enumerate(sorted(pred[node], key=x.__getitem__)):
+            in_port[source, node] = x[node] + offset + i
+
+    # Route every channel, then lay the layers and channels out top to bottom
+    channels = []
+    spare_column = canvas_width
+    for i in range(len(layers) - 1):
+        segments = [
+            _Segment(out_port[node, target], in_port[node, target], wire)
+            for wire, path in enumerate(wires)
+            for node, target in zip(path, path[1:])
+            if node_layer[node] == i
+        ]
+        rows, spare_column = _assign_tracks(segments, spare_column)
+        channels.append((segments, max(rows, 1)))
+    top = [0]
+    for _, rows in channels:
+        top.append(top[-1] + 3 + rows)
+
+    cells = [[0] * spare_column for _ in range(top[-1] + 3)]
+
+    def draw(points):
+        for (r1, c1), (r2, c2) in zip(points, points[1:]):
+            if c1 == c2:
+                step = 1 if r2 > r1 else -1
+                for r in range(r1, r2, step):
+                    cells[r][c1] |= DOWN if step > 0 else UP
+                    cells[r + step][c1] |= UP if step > 0 else DOWN
+            else:
+                step = 1 if c2 > c1 else -1
+                for c in range(c1, c2, step):
+                    cells[r1][c] |= RIGHT if step > 0 else LEFT
+                    cells[r1][c + step] |= LEFT if step > 0 else RIGHT
+
+    for i, (segments, _) in enumerate(channels):
+        upper, lower = top[i] + 2, top[i + 1]
+        for segment in segments:
+            start = upper if segment.has_top else upper + 1 + segment.after.track
+            end = lower if segment.has_bottom else None
+            turn = upper + 1 + segment.track
+            if segment.top == segment.bottom:
+                draw([(start, segment.top), (lower, segment.bottom)])
+                continue
+            points = [(start, segment.top), (turn, segment.top), (turn, segment.bottom)]
+            if end is not None:
+                points.append((end, segment.bottom))
+            draw(points)
+    for layer, row in zip(layers, top):
+        for node in layer:
+            if labels[node] is None:
+                draw([(row, x[node]), (row + 2, x[node])])
+
+    lines = [[LINE_CHARS.get(cell, " ") for cell in line] for line in cells]
+    for layer, row in zip(layers, top):
+        for node in layer:
+            label = labels[node]
+            if label is None:
+                continue
+            left, inner = x[node], width[node] - 2
+            ins = {in_port[source, node] for source in pred[node]}
+            outs = {out_port[node, target] for target in succ[node]}
+            lines[row][left : left + inner + 2] = (
+                ["┌"]
+                + ["▽" if left + 1 + i in ins else "─" for i in range(inner)]
+                + ["┐"]
+            )
+            lines[row + 1][left : left + inner + 2] = (
+                ["│"] + list(label.ljust(inner)) + ["│"]
+            )
+            lines[row + 2][left : left + inner + 2] = (
+                ["└"]
+                + ["┬" if left + 1 + i in outs else "─" for i in range(inner)]
+                + ["┘"]
+            )
+    return "\n".join("".join(line).rstrip() for line in lines)
+
+
+def render_graphdag(edges: Iterable[Tuple[str, str]]) -> str:
+    """Render DAG edges in-process, reusing the diagram of an identical edge set."""
+    edges = sorted(edges)
+    key = hashlib.sha256(
+        "\n".join(f"{source}->{target}" for source, target in edges).encode()
+    ).hexdigest()
+    return layered_cache.get_or_create(key, lambda: render_layered(edges))
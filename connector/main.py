@@ -1,11 +1,41 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from starlette.middleware.cors import CORSMiddleware
 
+from analysis import context_cache
+from compression import CompressionMiddleware
+from diagon import DiagonBusy, diagon_cache
+from executor import ExecutorBusy, ExecutorTimeout, cpu_executor, graph_executor
+from layered import layered_cache
+from metrics import (
+    EXPOSITION_MEDIA_TYPE,
+    MetricsMiddleware,
+    executor_queue_depth,
+    registry,
+    watch_cache,
+)
 from routers.graphdag import router as graphdag_router
 from routers.diff import router as diff_router
 from routers.connections import router as connections_router
+from warmup import WARMUP_ENABLED, warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Uvicorn only accepts connections once startup is done, so /health does not
+    # answer before the preset positions are cached (serve.py warms them before
+    # forking, which makes this a no-op in its workers)
+    if WARMUP_ENABLED:
+        warm_up()
+    cpu_executor.start()
+    graph_executor.start()
+    yield
+    cpu_executor.shutdown()
+    graph_executor.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,11 +44,33 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# Added last so it is outermost and its latency covers compression too
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(graphdag_router)
 app.include_router(diff_router)
 app.include_router(connections_router)
 
+watch_cache("connections", context_cache)
+watch_cache("diagon", diagon_cache)
+watch_cache("layered", layered_cache)
+executor_queue_depth.set_function(lambda: cpu_executor.pending, cpu_executor.name)
+executor_queue_depth.set_function(lambda: graph_executor.pending, graph_executor.name)
+
+
+@app.exception_handler(ExecutorBusy)
+@app.exception_handler(DiagonBusy)
+async def executor_busy_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=503, content={"error": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(ExecutorTimeout)
+async def executor_timeout_handler(request: Request, exc: ExecutorTimeout):
+    return JSONResponse(status_code=504, content={"error": str(exc)})
+
 
 @app.get("/health")
 async def health_check():
@@ -26,6 +78,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    # Per worker process: under serve.py each scrape reads one worker's registry
+    return Response(registry.render(), media_type=EXPOSITION_MEDIA_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     import os
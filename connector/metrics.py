@@ -0,0 +1,374 @@
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# In-process metrics in the Prometheus text exposition format, served at /metrics.
+# Recording is lock-free: every thread that records into a metric gets its own
+# pre-allocated list of slots and only ever writes to that, so threads never race
+# and the hot path is a bisect and two list updates. Scrapes sum the per-thread
+# lists. Each worker process keeps its own registry, so with serve.py's N workers
+# a scrape sees whichever worker answers; add the worker's pid as a target label
+# or scrape them behind their own ports if per-process totals matter.
+
+EXPOSITION_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; fine-grained at the low end, where cached responses and layers land
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '%s="%s"'
+        % (
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Sharded:
+    """Slots of one labelled series, kept per recording thread."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._shards: List[list] = []
+        self._local = threading.local()
+        self._register = threading.Lock()  # taken once per thread, not per record
+
+    def shard(self) -> list:
+        try:
+            return self._local.slots
+        except AttributeError:
+            slots = [0] * self.size
+            with self._register:
+                self._shards.append(slots)
+            self._local.slots = slots
+            return slots
+
+    def totals(self) -> list:
+        totals = [0] * self.size
+        for slots in list(self._shards):
+            for i, value in enumerate(slots):
+                totals[i] += value
+        return totals
+
+
+class _CounterChild(_Sharded):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self.shard()[0] += amount
+
+
+class _HistogramChild(_Sharded):
+    def __init__(self, bounds: Tuple[float, ...]):
+        # One slot per bucket, one for +Inf, then the running sum
+        super().__init__(len(bounds) + 2)
+        self.bounds = bounds
+
+    def observe(self, value: float) -> None:
+        slots = self.shard()
+        slots[bisect_left(self.bounds, value)] += 1
+        slots[-1] += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _Metric(ABC):
+    """Name, help text and rendering shared by every metric type."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    @abstractmethod
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(suffix, formatted labels, value) for every sample line."""
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _RecordedMetric(_Metric):
+    """A metric recorded into, one lock-free series per set of label values."""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._children: Dict[Tuple[str, ...], _Sharded] = {}
+        if not self.label_names:
+            self._default = self.labels()
+
+    @abstractmethod
+    def _new_child(self) -> _Sharded:
+        """An empty series."""
+
+    def labels(self, *values: str):
+        """The series for these label values; look it up once and keep it if hot."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}")
+            # setdefault keeps the first child if two threads race to create one
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+
+class Counter(_RecordedMetric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            labels = _format_labels(self.label_names, values)
+            yield "", labels, child.totals()[0]
+
+
+class Histogram(_RecordedMetric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+    def samples(self):
+        names = self.label_names + ("le",)
+        for values, child in list(self._children.items()):
+            totals = child.totals()
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), totals):
+                cumulative += count
+                labels = _format_labels(names, values + (_format_value(bound),))
+                yield "_bucket", labels, cumulative
+            labels = _format_labels(self.label_names, values)
+            yield "_sum", labels, totals[-1]
+            yield "_count", labels, cumulative
+
+
+class Gauge(_Metric):
+    """A value read when scraped, from a callback per label set."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set_function(self, func: Callable[[], float], *values: str) -> None:
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}")
+        self._callbacks[values] = func
+
+    def samples(self):
+        for values, func in list(self._callbacks.items()):
+            yield "", _format_labels(self.label_names, values), func()
+
+
+class CounterFunction(Gauge):
+    """A Gauge for totals that only grow, such as counts another object keeps."""
+
+    kind = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(
+    Histogram(
+        "connector_request_duration_seconds",
+        "Time from request to the last byte of the response, by route template",
+        labels=("method", "route", "status"),
+    )
+)
+layer_duration = registry.register(
+    Histogram(
+        "connector_layer_compute_seconds",
+        "Time to compute one analysis layer of a position (cache misses only)",
+        labels=("layer",),
+    )
+)
+diagon_duration = registry.register(
+    Histogram(
+        "connector_diagon_seconds",
+        "Wall time of diagon subprocesses, from spawn to exit",
+        labels=("outcome",),
+    )
+)
+executor_rejections = registry.register(
+    Counter(
+        "connector_executor_rejected_total",
+        "Tasks refused with 503 because the executor queue was full",
+        labels=("executor",),
+    )
+)
+executor_timeouts = registry.register(
+    Counter(
+        "connector_executor_timeouts_total",
+        "Tasks abandoned with 504 after their timeout",
+        labels=("executor",),
+    )
+)
+executor_queue_depth = registry.register(
+    Gauge(
+        "connector_executor_queue_depth",
+        "Tasks submitted to the executor and not yet finished",
+        labels=("executor",),
+    )
+)
+cache_hits = registry.register(
+    CounterFunction(
+        "connector_cache_hits_total", "Cache lookups that found an entry", ("cache",)
+    )
+)
+cache_misses = registry.register(
+    CounterFunction(
+        "connector_cache_misses_total", "Cache lookups that found nothing", ("cache",)
+    )
+)
+cache_hit_ratio = registry.register(
+    Gauge("connector_cache_hit_ratio", "Hits over lookups since start", ("cache",))
+)
+cache_size = registry.register(
+    Gauge("connector_cache_entries", "Entries currently cached", ("cache",))
+)
+
+
+def watch_cache(name: str, cache) -> None:
+    """Export an LRUCache's counters, read from the cache itself at scrape time."""
+    cache_hits.set_function(lambda: cache.hits, name)
+    cache_misses.set_function(lambda: cache.misses, name)
+    cache_hit_ratio.set_function(lambda: cache.stats()["hit_ratio"], name)
+    cache_size.set_function(lambda: len(cache), name)
+
+
+def timed_layer(layer: str) -> Callable:
+    """Decorate an AnalysisContext layer builder to record its compute time."""
+    child = layer_duration.labels(layer)
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsMiddleware:
+    """Record every HTTP request's latency, labelled by its route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route: Optional[object] = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            request_duration.labels(scope["method"], path, str(status)).observe(
+                time.perf_counter() - start
+            )
@@ -0,0 +1,38 @@
+import networkx as nx
+from typing import TYPE_CHECKING, Dict, List, Union
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Kept apart from utils.py so that serving requests never imports networkx or
+# matplotlib; only debugging and notebook code should import this module.
+
+
+def visualize_graph(
+    edges: List[Dict[str, str]], is_directed: bool = True, output: str = "str"
+) -> Union[str, "Figure"]:
+    """
+    Visualize a graph in text form
+    Accepts as arguments:
+    - edges as a list of dictionaries with 'source' and 'target' keys
+    - is_directed as a boolean indicating whether the graph is directed
+    - output as a string 'str' or 'Figure'
+    returns a string representation of the graph
+    """
+    if is_directed:
+        G = nx.DiGraph()
+    else:
+        G = nx.Graph()
+    for edge in edges:
+        G.add_edge(edge["source"], edge["target"])
+    if output == "str":
+        text_graph_lines = nx.readwrite.text.generate_network_text(G)
+        text_graph = "\n".join(text_graph_lines)
+        return text_graph
+    elif output == "Figure":
+        # pyplot alone takes most of a second to import
+        import matplotlib.pyplot as plt
+
+        fig = plt.figure()
+        nx.draw(G, with_labels=True)
+        return plt
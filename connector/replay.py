@@ -0,0 +1,57 @@
+import io
+import re
+import chess
+from typing import List, Optional, Tuple
+
+# Everything in PGN movetext that is not a move: comments, variations, NAGs,
+# move numbers and results
+MOVETEXT_NOISE = re.compile(
+    r"\{[^}]*\}|\([^)]*\)|;[^\n]*|\$\d+|\d+\.(?:\.\.)?|1-0|0-1|1/2-1/2|\*"
+)
+
+
+def movetext_tokens(movetext: str) -> List[str]:
+    """
+    Split PGN movetext such as "1. e4 c5 2. Nf3 {comment} d6" into move tokens.
+    returns SAN strings with annotation suffixes (!, ?) removed
+    """
+    tokens = MOVETEXT_NOISE.sub(" ", movetext).split()
+    return [token.rstrip("!?") for token in tokens if token.rstrip("!?")]
+
+
+def parse_move(board: chess.Board, token: str) -> chess.Move:
+    """
+    Parse a UCI or SAN move in the context of board.
+    Raises ValueError if the move is malformed or illegal.
+    """
+    try:
+        return board.parse_uci(token)
+    except ValueError:
+        return board.parse_san(token)
+
+
+def load_game(
+    start_fen: str, moves: Optional[List[str]] = None, pgn: Optional[str] = None
+) -> Tuple[chess.Board, List[str]]:
+    """
+    Resolve a game request into a starting board and its move tokens.
+    accepts a starting FEN plus either a UCI/SAN move list or PGN text; PGN with
+    tag pairs may set its own start through a FEN tag
+    Raises ValueError for an invalid FEN or unreadable PGN.
+    """
+    board = chess.Board(start_fen)
+    if pgn is not None and pgn.lstrip().startswith("["):
+        # The PGN parser (and the SVG and engine modules it pulls in) is only
+        # needed for full PGN with tag pairs, so it is not imported at startup
+        from chess.pgn import read_game
+
+        if "[FEN " not in pgn:
+            pgn = f'[FEN "{board.fen()}"]\n[SetUp "1"]\n{pgn.lstrip()}'
+        game = read_game(io.StringIO(pgn))
+        if game is None or game.errors:
+            raise ValueError("Invalid PGN")
+        return game.board(), [move.uci() for move in game.mainline_moves()]
+
+    if pgn is not None:
+        return board, movetext_tokens(pgn)
+    return board, list(moves or [])
@@ -1,121 +1,63 @@
+import os
 import chess
-from fastapi import APIRouter, Query
-from typing import List, Dict
-from utils import get_nodes, get_edges
+from fastapi import APIRouter, Header, Query, Response
+from pydantic import BaseModel
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+from analysis import (
+    AnalysisContext,
+    context_cache,
+    get_context,
+    parse_layers,
+    position_key,
+)
+from cache import IMMUTABLE_CACHE_CONTROL, etag_matches, strong_etag
+from executor import ExecutorBusy, ExecutorTimeout, cpu_executor
+from replay import load_game, parse_move
+from serialize import (
+    Fragment,
+    connections_fragment,
+    dumps,
+    json_response,
+    ndjson_response,
+    rendered,
+    rendered_line,
+    wants_ndjson,
+)
+from wire import (
+    BINARY_MEDIA_TYPE,
+    FORMATS,
+    columnar_body,
+    encode_graph,
+    negotiate_format,
+)
 
 router = APIRouter()
 
+MAX_BATCH_SIZE = int(os.environ.get("CONNECTIONS_MAX_BATCH_SIZE", 1024))
+
+
+class ConnectionsBatchRequest(BaseModel):
+    fens: List[str]
+    layers: str = "all"
+    heatmap: bool = False
+
+
+class ConnectionsGameRequest(BaseModel):
+    start_fen: str = chess.STARTING_FEN
+    moves: Optional[List[str]] = None
+    pgn: Optional[str] = None
+    layers: str = "all"
+    heatmap: bool = False
+
 
 def get_adjacency_edges(board: chess.Board) -> List[dict]:
     """Extract adjacency edge generation logic."""
-    edges = []
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            current_rank = chess.square_rank(square)
-            current_file = chess.square_file(square)
-            for rank_offset in [-1, 0, 1]:
-                for file_offset in [-1, 0, 1]:
-                    if (rank_offset, file_offset) == (0, 0):
-                        continue
-                    adjacent_rank = current_rank + rank_offset
-                    adjacent_file = current_file + file_offset
-                    if 0 <= adjacent_rank <= 7 and 0 <= adjacent_file <= 7:
-                        adjacent_square = chess.square(adjacent_file, adjacent_rank)
-                        adjacent_piece = board.piece_at(adjacent_square)
-                        if adjacent_piece:  # Only include if there's a piece there
-                            edges.append(
-                                {
-                                    "type": "adjacency",
-                                    "source": chess.square_name(square),
-                                    "target": chess.square_name(adjacent_square),
-                                }
-                            )
-    return edges
+    return AnalysisContext(board).adjacency_edges
 
 
 def get_shadow_edges(board: chess.Board) -> List[dict]:
     """Extract shadow edge generation logic."""
-    shadows = []
-
-    # Direction vectors for sliding pieces
-    rook_directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-    bishop_directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-    queen_directions = rook_directions + bishop_directions
-
-    def get_pieces_along_ray(board, start_square, direction):
-        """Find all pieces along a ray from start_square in given direction."""
-        pieces = []
-        file, rank = chess.square_file(start_square), chess.square_rank(start_square)
-        d_file, d_rank = direction
-
-        file += d_file
-        rank += d_rank
-
-        while 0 <= file <= 7 and 0 <= rank <= 7:
-            square = chess.square(file, rank)
-            piece = board.piece_at(square)
-            if piece:
-                pieces.append((square, piece))
-            file += d_file
-            rank += d_rank
-
-        return pieces
-
-    # Check each square for sliding pieces
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece is None:
-            continue
-
-        # Determine directions based on piece type
-        if piece.piece_type == chess.QUEEN:
-            directions = queen_directions
-        elif piece.piece_type == chess.ROOK:
-            directions = rook_directions
-        elif piece.piece_type == chess.BISHOP:
-            directions = bishop_directions
-        else:
-            continue  # Skip kings, knights, and pawns
-
-        # For each direction, find shadow connections
-        for direction in directions:
-            pieces_in_ray = get_pieces_along_ray(board, square, direction)
-
-            # Need at least 2 pieces in the ray for a shadow connection
-            if len(pieces_in_ray) >= 2:
-                blocker_square, blocker_piece = pieces_in_ray[0]
-                target_square, target_piece = pieces_in_ray[1]
-
-                # Caster edge: sliding piece → blocker
-                caster_type = (
-                    "caster_protection"
-                    if piece.color == blocker_piece.color
-                    else "caster_threat"
-                )
-                shadows.append(
-                    {
-                        "source": chess.square_name(square),
-                        "target": chess.square_name(blocker_square),
-                        "type": caster_type,
-                    }
-                )
-
-                # Shadow edge: blocker → target (represents what would happen if blocker vanished)
-                shadow_type = (
-                    "shadow_protection"
-                    if piece.color == target_piece.color
-                    else "shadow_threat"
-                )
-                shadows.append(
-                    {
-                        "source": chess.square_name(blocker_square),
-                        "target": chess.square_name(target_square),
-                        "type": shadow_type,
-                    }
-                )
-
-    return shadows
+    return AnalysisContext(board).shadow_edges
 
 
 def get_king_box_edges(board: chess.Board) -> tuple[List[dict], List[dict]]:
@@ -123,72 +65,216 @@ def get_king_box_edges(board: chess.Board) -> tuple[List[dict], List[dict]]:
     Generate king box edges showing king movement constraints.
     Returns (edges, phantom_nodes) where phantom_nodes are empty squares king can move to.
     """
-    edges = []
-    phantom_nodes = []
-
-    # Process both kings
-    for color in [chess.WHITE, chess.BLACK]:
-        king_square = board.king(color)
-        if not king_square:
-            continue
-
-        king_square_name = chess.square_name(king_square)
-        king_file = chess.square_file(king_square)
-        king_rank = chess.square_rank(king_square)
-
-        # Check all 8 squares around the king
-        for file_offset in [-1, 0, 1]:
-            for rank_offset in [-1, 0, 1]:
-                if file_offset == 0 and rank_offset == 0:
-                    continue  # Skip king's current square
-
-                new_file = king_file + file_offset
-                new_rank = king_rank + rank_offset
-
-                # Skip off-board squares
-                if not (0 <= new_file <= 7 and 0 <= new_rank <= 7):
-                    continue
-
-                target_square = chess.square(new_file, new_rank)
-                target_square_name = chess.square_name(target_square)
-                piece = board.piece_at(target_square)
-
-                # Determine edge type based on square status
-                if piece:
-                    if piece.color == color:
-                        edge_type = "king_blocked_ally"
-                    else:
-                        edge_type = "king_blocked_threat"
-                else:
-                    # Empty square - check if safe
-                    temp_board = board.copy()
-                    temp_board.set_piece_at(king_square, None)
-                    temp_board.set_piece_at(
-                        target_square, chess.Piece(chess.KING, color)
+    return AnalysisContext(board).king_box
+
+
+def connections_body(fen_string: str, layers: str, heatmap: bool) -> dict:
+    try:
+        board = chess.Board(fen_string)
+    except ValueError:
+        return {"error": "Invalid FEN string"}
+
+    # One analysis per position; each layer is computed lazily and only once
+    context = get_context(board)
+    return context.connections(parse_layers(layers), heatmap=heatmap)
+
+
+def connections_encoded_body(
+    fen_string: str, layers: str, heatmap: bool, response_format: str
+) -> Tuple[str, bytes]:
+    """
+    connections_body rendered in the requested format: json, binary or columnar.
+    returns the media type and encoded body; errors are always JSON
+    """
+    if response_format == "columnar":
+        try:
+            board = chess.Board(fen_string)
+        except ValueError:
+            return "application/json", dumps({"error": "Invalid FEN string"})
+        body = columnar_body(get_context(board), parse_layers(layers), heatmap)
+        return "application/json", dumps(body)
+    if response_format == "binary":
+        body = connections_body(fen_string, layers, heatmap)
+        if "error" not in body:
+            return BINARY_MEDIA_TYPE, encode_graph(body, heatmap)
+        return "application/json", dumps(body)
+    try:
+        board = chess.Board(fen_string)
+    except ValueError:
+        return "application/json", dumps({"error": "Invalid FEN string"})
+    body = connections_fragment(get_context(board), parse_layers(layers), heatmap)
+    return "application/json", body.encode()
+
+
+def position_result(
+    board: chess.Board, requested_layers: Set[str], heatmap: bool, encoded: bool
+) -> Union[dict, Fragment]:
+    context = get_context(board)
+    if encoded:
+        return connections_fragment(context, requested_layers, heatmap)
+    return context.connections(requested_layers, heatmap=heatmap)
+
+
+def fen_result(
+    fen_string: str, requested_layers: Set[str], heatmap: bool, encoded: bool = False
+) -> Union[dict, Fragment]:
+    try:
+        board = chess.Board(fen_string)
+    except ValueError:
+        return {"error": "Invalid FEN string"}
+    return position_result(board, requested_layers, heatmap, encoded)
+
+
+def connections_batch_body(
+    fens: List[str], layers: str, heatmap: bool, encoded: bool = False
+) -> dict:
+    """
+    Connections for each FEN, in order.
+    With encoded set, each position's result is a pre-encoded Fragment for dumps.
+    """
+    if len(fens) > MAX_BATCH_SIZE:
+        return {"error": f"Batch size exceeds limit of {MAX_BATCH_SIZE}"}
+
+    requested_layers = parse_layers(layers)
+    by_fen: Dict[str, Union[dict, Fragment]] = {}
+    by_position: Dict[str, Union[dict, Fragment]] = {}
+    results = []
+    for fen_string in fens:
+        if fen_string not in by_fen:
+            try:
+                board = chess.Board(fen_string)
+            except ValueError:
+                by_fen[fen_string] = {"error": "Invalid FEN string"}
+            else:
+                key = position_key(board)
+                if key not in by_position:
+                    by_position[key] = position_result(
+                        board, requested_layers, heatmap, encoded
                     )
+                by_fen[fen_string] = by_position[key]
+        results.append(by_fen[fen_string])
+    return {"results": results}
+
+
+def ply_result(
+    board: chess.Board,
+    ply: int,
+    move: Optional[chess.Move],
+    san: Optional[str],
+    requested_layers: Set[str],
+    heatmap: bool,
+    encoded: bool = False,
+) -> Union[dict, Fragment]:
+    """One /connections/game entry: board's connections after the given ply."""
+    header = {
+        "ply": ply,
+        "move": move.uci() if move else None,
+        "san": san,
+        "fen": board.fen(),
+    }
+    context = get_context(board)
+    if encoded:
+        # Splice the cached {"nodes":...,"edges":...} object in after the header
+        body = connections_fragment(context, requested_layers, heatmap)
+        return Fragment(dumps(header).decode()[:-1] + "," + body[1:])
+    return {**header, **context.connections(requested_layers, heatmap)}
+
+
+def load_limited_game(
+    start_fen: str, moves: Optional[List[str]], pgn: Optional[str]
+) -> Tuple[chess.Board, List[str]]:
+    """
+    load_game, also raising ValueError for games with more positions than the
+    batch size limit; the start position counts, so MAX_BATCH_SIZE - 1 plies.
+    """
+    board, tokens = load_game(start_fen, moves, pgn)
+    if len(tokens) >= MAX_BATCH_SIZE:
+        raise ValueError(f"Games are limited to {MAX_BATCH_SIZE - 1} plies")
+    return board, tokens
+
+
+def connections_game_body(
+    start_fen: str,
+    moves: Optional[List[str]],
+    pgn: Optional[str],
+    layers: str,
+    heatmap: bool,
+    encoded: bool = False,
+) -> dict:
+    """
+    Connections for every position of a replayed game.
+    With encoded set, each ply's result is a pre-encoded Fragment for dumps.
+    """
+    try:
+        board, tokens = load_limited_game(start_fen, moves, pgn)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    requested_layers = parse_layers(layers)
+    results = [ply_result(board, 0, None, None, requested_layers, heatmap, encoded)]
+    for ply, token in enumerate(tokens, start=1):
+        try:
+            move = parse_move(board, token)
+        except ValueError:
+            return {"error": f"Illegal move at ply {ply}: {token}"}
+        san = board.san(move)
+        board.push(move)
+        results.append(
+            ply_result(board, ply, move, san, requested_layers, heatmap, encoded)
+        )
+    return {"results": results}
+
+
+async def batch_lines(
+    fens: List[str], requested_layers: Set[str], heatmap: bool
+) -> AsyncIterator[bytes]:
+    # Each FEN is its own executor task, so only one result is held at a time
+    for fen_string in fens:
+        yield await cpu_executor.run(
+            rendered_line, fen_result, fen_string, requested_layers, heatmap, True
+        )
+
+
+async def game_lines(
+    board: chess.Board, tokens: List[str], requested_layers: Set[str], heatmap: bool
+) -> AsyncIterator[bytes]:
+    # Moves are parsed and pushed here, between tasks, so the board never changes
+    # while a worker reads it
+    move = san = None
+    for ply, token in enumerate([None, *tokens]):
+        if token is not None:
+            try:
+                move = parse_move(board, token)
+            except ValueError:
+                yield dumps({"error": f"Illegal move at ply {ply}: {token}"}) + b"\n"
+                return
+            san = board.san(move)
+            board.push(move)
+        yield await cpu_executor.run(
+            rendered_line,
+            ply_result,
+            board,
+            ply,
+            move,
+            san,
+            requested_layers,
+            heatmap,
+            True,
+        )
+
+
+async def until_failure(lines: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # The status line is long gone once streaming starts, so a busy or timed-out
+    # executor ends the stream with an error record instead
+    try:
+        async for line in lines:
+            yield line
+    except (ExecutorBusy, ExecutorTimeout) as e:
+        yield dumps({"error": str(e)}) + b"\n"
+
 
-                    if temp_board.is_attacked_by(not color, target_square):
-                        edge_type = "king_blocked_threat"
-                    else:
-                        edge_type = "king_can_move"
-                        # Add phantom node for empty safe squares
-                        phantom_nodes.append(
-                            {
-                                "square": target_square_name,
-                                "piece_type": "phantom",
-                                "color": "phantom",
-                            }
-                        )
-
-                edges.append(
-                    {
-                        "type": edge_type,
-                        "source": king_square_name,
-                        "target": target_square_name,
-                    }
-                )
-
-    return edges, phantom_nodes
+def stream(lines: AsyncIterator[bytes]):
+    return ndjson_response(until_failure(lines), headers={"Vary": "Accept"})
 
 
 @router.get("/connections/")
@@ -203,6 +289,12 @@ async def get_connections(
     heatmap: bool = Query(
         False, description="Include heatmap data (attack counts per square)"
     ),
+    format: Optional[str] = Query(
+        None,
+        description=f"Response format ({', '.join(FORMATS)}); defaults to the Accept header, then json",
+    ),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Unified endpoint that returns nodes and edges for multiple visualization layers.
@@ -219,39 +311,115 @@ async def get_connections(
     without making multiple API calls or duplicating node data.
 
     Use layers='none' to get only nodes with no edges (equivalent to /none endpoint).
+
+    Send format=binary (or Accept: application/vnd.connector.graph) for a packed
+    encoding with one byte per square and edge type; see wire.py for the layout.
+    Send format=columnar for parallel node arrays and per-layer source/target/
+    type_code arrays, type_code indexing the returned 'edge_types' list.
+
+    Successful responses carry a strong ETag derived from the position, layers,
+    heatmap flag and format, and may be cached as immutable; a matching
+    If-None-Match gets a 304 without any work being done.
     """
+    response_format = negotiate_format(format, accept)
+    if response_format not in FORMATS:
+        return {"error": f"Unknown format: {response_format}"}
+    # The body depends on Accept, so shared caches must key on it too
+    headers = {"Vary": "Accept"}
     try:
         board = chess.Board(fen_string)
     except ValueError:
-        return {"error": "Invalid FEN string"}
-
-    # Parse requested layers
-    if layers == "all":
-        requested_layers = {"adjacencies", "links", "king_box", "shadows"}
-    elif layers == "none" or not layers.strip():
-        requested_layers = set()
+        pass  # answered below with an uncacheable error body
     else:
-        requested_layers = set(layer.strip() for layer in layers.split(","))
-
-    # Start with base nodes
-    nodes = get_nodes(board, heatmap=heatmap)
-    edges = []
-
-    # Collect edges from each requested layer
-    if "adjacencies" in requested_layers:
-        edges.extend(get_adjacency_edges(board))
+        etag = strong_etag(
+            "connections",
+            response_format,
+            position_key(board),
+            ",".join(sorted(parse_layers(layers))),
+            str(heatmap),
+        )
+        headers.update({"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL})
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    media_type, body = await cpu_executor.run(
+        connections_encoded_body, fen_string, layers, heatmap, response_format
+    )
+    return Response(body, media_type=media_type, headers=headers)
+
+
+@router.get("/connections/cache")
+async def get_connections_cache_stats():
+    """Hit/miss counters and occupancy of the /connections result cache."""
+    return context_cache.stats()
+
+
+@router.post("/connections/batch")
+async def get_connections_batch(
+    request: ConnectionsBatchRequest, accept: Optional[str] = Header(None)
+):
+    """
+    Batch variant of /connections/ for many positions in one call.
 
-    if "links" in requested_layers:
-        # Links provides threat/protection edges
-        edges.extend(get_edges(board))
+    Returns {"results": [...]} with one entry per input FEN, in input order.
+    Each entry is a /connections/ body, or {"error": ...} for that FEN alone.
+    Repeated FENs (and FENs differing only in fields that do not affect the
+    attack graphs) are computed once.
 
-    if "king_box" in requested_layers:
-        king_box_edges, phantom_nodes = get_king_box_edges(board)
-        edges.extend(king_box_edges)
-        # Add phantom nodes to the main nodes list
-        nodes.extend(phantom_nodes)
+    With "Accept: application/x-ndjson" the entries are streamed instead, one
+    per line as each is computed; repeated FENs are then served from the
+    position cache rather than deduplicated up front.
+    """
+    if wants_ndjson(accept):
+        if len(request.fens) > MAX_BATCH_SIZE:
+            error = {"error": f"Batch size exceeds limit of {MAX_BATCH_SIZE}"}
+            return json_response(dumps(error), headers={"Vary": "Accept"})
+        requested_layers = parse_layers(request.layers)
+        return stream(batch_lines(request.fens, requested_layers, request.heatmap))
+    body = await cpu_executor.run(
+        rendered,
+        connections_batch_body,
+        request.fens,
+        request.layers,
+        request.heatmap,
+        True,
+    )
+    return json_response(body, headers={"Vary": "Accept"})
+
+
+@router.post("/connections/game")
+async def get_connections_game(
+    request: ConnectionsGameRequest, accept: Optional[str] = Header(None)
+):
+    """
+    Connections for every ply of a game, from its start position onwards.
 
-    if "shadows" in requested_layers:
-        edges.extend(get_shadow_edges(board))
+    Takes a start_fen plus either 'moves' (UCI or SAN strings) or 'pgn'
+    (movetext such as "e4 c5 Nf3", or a full PGN with tag pairs).
+    Returns {"results": [...]} where each entry is a /connections/ body with
+    'ply', 'move' (UCI), 'san' and 'fen' added; ply 0 is the start position.
+    The game is replayed by pushing moves onto a single board.
 
-    return {"nodes": nodes, "edges": edges}
+    With "Accept: application/x-ndjson" the entries are streamed instead, one
+    per line as each ply is computed. An illegal move then ends the stream with
+    an {"error": ...} line after the plies before it.
+    """
+    if wants_ndjson(accept):
+        try:
+            board, tokens = load_limited_game(
+                request.start_fen, request.moves, request.pgn
+            )
+        except ValueError as e:
+            return json_response(dumps({"error": str(e)}), headers={"Vary": "Accept"})
+        requested_layers = parse_layers(request.layers)
+        return stream(game_lines(board, tokens, requested_layers, request.heatmap))
+    body = await cpu_executor.run(
+        rendered,
+        connections_game_body,
+        request.start_fen,
+        request.moves,
+        request.pgn,
+        request.layers,
+        request.heatmap,
+        True,
+    )
+    return json_response(body, headers={"Vary": "Accept"})
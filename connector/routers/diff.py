@@ -1,75 +1,185 @@
 import chess
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Header, Query, Response
+from typing import List, Optional
+from analysis import diff_connections, get_context, parse_layers
+from attacks import SQUARE_NAMES, changed_squares
+from cache import IMMUTABLE_CACHE_CONTROL, etag_matches, strong_etag
+from executor import cpu_executor
+from serialize import json_response, rendered
 
 router = APIRouter()
 
 
+def match_moves(from_board: chess.Board, to_board: chess.Board) -> List[dict]:
+    """
+    Pair vacated squares with arrival squares using per-piece bitboard XORs.
+    Each vacated square takes the lowest arrival square holding the same piece,
+    else the lowest changed square of the same color (capture-promotion). Once
+    those are paired, each pawn still unmatched takes the lowest same-color
+    arrival on its promotion rank (promotion).
+    """
+    from_occupied = from_board.occupied
+    to_occupied = to_board.occupied
+    vacated = from_occupied & ~to_occupied
+    arrived = to_occupied & ~from_occupied
+    changed = changed_squares(from_board, to_board) & from_occupied & to_occupied
+
+    pairs = {}
+    for from_sq in chess.scan_forward(vacated):
+        piece_type = from_board.piece_type_at(from_sq)
+        color = bool(from_board.occupied_co[chess.WHITE] & chess.BB_SQUARES[from_sq])
+        candidates = (
+            arrived & to_board.pieces_mask(piece_type, color)
+            or changed & to_board.occupied_co[color]
+        )
+        if not candidates:
+            continue
+        to_sq = chess.lsb(candidates)
+        arrived &= ~chess.BB_SQUARES[to_sq]
+        changed &= ~chess.BB_SQUARES[to_sq]
+        pairs[from_sq] = to_sq
+
+    for from_sq in chess.scan_forward(vacated & from_board.pawns):
+        if from_sq in pairs:
+            continue
+        color = bool(from_board.occupied_co[chess.WHITE] & chess.BB_SQUARES[from_sq])
+        back_rank = chess.BB_RANK_8 if color == chess.WHITE else chess.BB_RANK_1
+        candidates = arrived & to_board.occupied_co[color] & back_rank
+        if not candidates:
+            continue
+        to_sq = chess.lsb(candidates)
+        arrived &= ~chess.BB_SQUARES[to_sq]
+        pairs[from_sq] = to_sq
+
+    return [
+        {
+            "from_square": SQUARE_NAMES[from_sq],
+            "to_square": SQUARE_NAMES[pairs[from_sq]],
+        }
+        for from_sq in sorted(pairs)
+    ]
+
+
+def legal_move_between(
+    from_board: chess.Board, to_board: chess.Board
+) -> Optional[chess.Move]:
+    """The legal move of from_board that produces to_board's placement, if any."""
+    vacated = from_board.occupied & ~to_board.occupied
+    placement = to_board.board_fen()
+    for move in from_board.generate_legal_moves(from_mask=vacated):
+        from_board.push(move)
+        reached = from_board.board_fen() == placement
+        from_board.pop()
+        if reached:
+            return move
+    return None
+
+
+def move_squares(board: chess.Board, move: chess.Move) -> List[dict]:
+    """Every (from_square, to_square) pair a move makes on board, rook included."""
+    moves = [
+        {
+            "from_square": SQUARE_NAMES[move.from_square],
+            "to_square": SQUARE_NAMES[move.to_square],
+        }
+    ]
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        if board.is_kingside_castling(move):
+            rook_from, rook_to = chess.square(7, rank), chess.square(5, rank)
+        else:
+            rook_from, rook_to = chess.square(0, rank), chess.square(3, rank)
+        moves.append(
+            {"from_square": SQUARE_NAMES[rook_from], "to_square": SQUARE_NAMES[rook_to]}
+        )
+        moves.sort(key=lambda pair: chess.parse_square(pair["from_square"]))
+    return moves
+
+
+def diff_etag(
+    from_board: chess.Board, to_board: chess.Board, verify: bool, layers: Optional[str]
+) -> str:
+    """
+    Strong ETag for a /diff request, keyed on what its body depends on: only the
+    placements, except that verify needs every field of from_fen.
+    """
+    return strong_etag(
+        "diff",
+        from_board.fen() if verify else from_board.board_fen(),
+        to_board.board_fen(),
+        str(verify),
+        "" if layers is None else "layers:" + ",".join(sorted(parse_layers(layers))),
+    )
+
+
+def diff_body(from_fen: str, to_fen: str, verify: bool, layers: Optional[str]) -> dict:
+    try:
+        from_board = chess.Board(from_fen)
+        to_board = chess.Board(to_fen)
+    except ValueError as e:
+        return {"error": str(e), "moves": []}
+
+    moves = match_moves(from_board, to_board)
+    verified = None
+    if verify:
+        legal_move = legal_move_between(from_board, to_board)
+        verified = legal_move is not None
+        if verified:
+            moves = move_squares(from_board, legal_move)
+
+    body = {"moves": moves}
+    if verified is not None:
+        body["verified"] = verified
+    if layers is not None:
+        body.update(
+            diff_connections(
+                get_context(from_board), get_context(to_board), parse_layers(layers)
+            )
+        )
+    return body
+
+
 @router.get("/diff")
 async def get_diff(
     from_fen: str = Query(
         ..., description="FEN string for the position before the move"
     ),
     to_fen: str = Query(..., description="FEN string for the position after the move"),
+    verify: bool = Query(
+        False,
+        description="Confirm the moves against the legal moves of from_fen",
+    ),
+    layers: Optional[str] = Query(
+        None,
+        description="Also diff these connection layers (comma-separated names or 'all')",
+    ),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Compare two FEN positions and return a list of moves as (from_square, to_square) pairs.
 
     Handles standard moves, captures, castling (king + rook), and promotions.
     Returns an empty list if either FEN is invalid.
+
+    With 'verify', the legal move of from_fen reaching to_fen's placement is used
+    instead, so castling, en passant and promotion resolve exactly; 'verified'
+    reports whether such a move exists (falling back to square matching if not).
+
+    With 'layers', also returns the node and per-layer edge changes between the two
+    /connections/ graphs, so clients can patch a graph instead of refetching it:
+    {"nodes": {"added", "removed"}, "edges": {layer: {"added", "removed"}}}
+
+    Successful responses carry a strong ETag and may be cached as immutable; a
+    matching If-None-Match gets a 304 without any work being done.
     """
+    headers = {}
     try:
-        from_board = chess.Board(from_fen)
-        to_board = chess.Board(to_fen)
-    except ValueError as e:
-        return {"error": str(e), "moves": []}
-
-    vacated = []  # squares with a piece in from_board but empty in to_board
-    arrived = []  # squares with a piece in to_board but empty in from_board
-    changed = []  # squares where the piece changed (captures, promotions)
-
-    for sq in chess.SQUARES:
-        fp = from_board.piece_at(sq)
-        tp = to_board.piece_at(sq)
-        if fp and not tp:
-            vacated.append((chess.square_name(sq), fp))
-        elif tp and not fp:
-            arrived.append((chess.square_name(sq), tp))
-        elif fp and tp and fp != tp:
-            changed.append((chess.square_name(sq), fp, tp))
-
-    moves = []
-    arrived_remaining = list(arrived)
-    changed_remaining = list(changed)
-
-    for from_sq, fp in vacated:
-        # Prefer exact piece type + color match (handles castling correctly)
-        matched = next(
-            (
-                (to_sq, tp)
-                for to_sq, tp in arrived_remaining
-                if fp.color == tp.color and fp.piece_type == tp.piece_type
-            ),
-            None,
-        )
-        if matched:
-            to_sq, _ = matched
-            moves.append({"from_square": from_sq, "to_square": to_sq})
-            arrived_remaining = [(s, p) for s, p in arrived_remaining if s != to_sq]
-        else:
-            # Promotion: pawn vacates, promoted piece arrives (different piece_type, same color)
-            matched_changed = next(
-                (
-                    (to_sq, fp2, tp2)
-                    for to_sq, fp2, tp2 in changed_remaining
-                    if fp.color == tp2.color
-                ),
-                None,
-            )
-            if matched_changed:
-                to_sq, _, _ = matched_changed
-                moves.append({"from_square": from_sq, "to_square": to_sq})
-                changed_remaining = [
-                    (s, a, b) for s, a, b in changed_remaining if s != to_sq
-                ]
-
-    return {"moves": moves}
+        etag = diff_etag(chess.Board(from_fen), chess.Board(to_fen), verify, layers)
+    except ValueError:
+        pass  # answered below with an uncacheable error body
+    else:
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    body = await cpu_executor.run(rendered, diff_body, from_fen, to_fen, verify, layers)
+    return json_response(body, headers=headers)
@@ -1,26 +1,157 @@
-import subprocess
-from fastapi import APIRouter, Request
+import asyncio
+import os
+import chess
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import JSONResponse
+from typing import Awaitable, Dict, List, Optional, Tuple
+import diagon
+import layered
+from analysis import get_context, parse_layers, position_key
+from cache import etag_matches, strong_etag
+from diagon import DiagonError
+from executor import graph_executor
 from utils import build_acyclic_graph
 
 router = APIRouter()
 
+# "diagon" shells out to the diagon binary; "python" draws in-process with layered.py
+RENDERERS = ("diagon", "python")
+DEFAULT_RENDERER = os.environ.get("GRAPHDAG_RENDERER", "diagon")
+
+# A drawing depends only on the position and the request options, so GET responses
+# may be reused for a day and revalidated by ETag after that
+GRAPHDAG_CACHE_CONTROL = os.environ.get(
+    "GRAPHDAG_CACHE_CONTROL", "public, max-age=86400"
+)
+
+
+def acyclic_edges(edges: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+    return list(build_acyclic_graph(edges).edges())
+
+
+def position_acyclic_edges(
+    board: chess.Board, layers: List[str], edge_types: List[str]
+) -> List[Tuple[str, str]]:
+    edges = get_context(board).connections(layers)["edges"]
+    if edge_types:
+        edges = [edge for edge in edges if edge["type"] in edge_types]
+    return acyclic_edges(edges)
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    # Once the body has been read, the next ASGI message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def unless_disconnected(request: Request, work: Awaitable):
+    """
+    Await work, cancelling it if the client goes away first.
+    returns the result of work, or None if the client disconnected
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    return task.result() if not task.cancelled() else None
+
+
+async def render(
+    request: Request, renderer: str, edges: List[Tuple[str, str]]
+) -> Optional[str]:
+    """
+    Draw acyclic edges with the chosen renderer.
+    returns the ASCII art, or None if the client disconnected while diagon ran;
+    raises DiagonError when diagon fails
+    """
+    if renderer == "python":
+        return await graph_executor.run(layered.render_graphdag, edges)
+    return await unless_disconnected(request, diagon.render_graphdag(edges))
+
+
+def unknown_renderer(renderer: str) -> dict:
+    return {"error": f"Unknown renderer: {renderer}. Use one of {', '.join(RENDERERS)}"}
+
 
 @router.put("/graphdag")
 async def generate_graphdag(request: Request):
     data = await request.json()
-    edges = data["edges"]
-    acyclic_graph = build_acyclic_graph(edges)
-    formatted_edges = [f"{u}->{v}" for u, v, _ in acyclic_graph.edges(data=True)]
-    command = ["diagon", "GraphDAG"]
-    process = subprocess.Popen(
-        command,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+    renderer = data.get("renderer", DEFAULT_RENDERER)
+    if renderer not in RENDERERS:
+        return unknown_renderer(renderer)
+    edges = await graph_executor.run(acyclic_edges, data["edges"])
+    try:
+        ascii_art = await render(request, renderer, edges)
+    except DiagonError as e:
+        return {"error": str(e), "stderr": e.stderr}
+    if ascii_art is None:
+        # Nobody is listening; 499 is the conventional "client closed request" status
+        return Response(status_code=499)
+    return {"ascii_art": ascii_art}
+
+
+@router.get("/graphdag")
+async def get_graphdag(
+    request: Request,
+    fen_string: str = Query(
+        ..., description="The FEN string representing the board state"
+    ),
+    layers: str = Query(
+        "all",
+        description="Comma-separated layer names (adjacencies,links,king_box,shadows), 'all', or 'none'",
+    ),
+    edge_types: Optional[str] = Query(
+        None,
+        description="Comma-separated edge types to keep (e.g. 'threat,protection'); all by default",
+    ),
+    renderer: str = Query(DEFAULT_RENDERER, description="'diagon' or 'python'"),
+):
+    """
+    GraphDAG ASCII art for a position, with the edges computed server-side.
+
+    Equivalent to fetching /connections/ and PUTting its (filtered) edges to
+    /graphdag, in one small request. Successful responses carry a strong ETag
+    derived from the position and options; a matching If-None-Match gets a 304
+    without any work being done.
+    """
+    if renderer not in RENDERERS:
+        return unknown_renderer(renderer)
+    try:
+        board = chess.Board(fen_string)
+    except ValueError:
+        return {"error": "Invalid FEN string"}
+
+    requested_layers = sorted(parse_layers(layers))
+    requested_types = sorted(set(filter(None, (edge_types or "").split(","))))
+    etag = strong_etag(
+        "graphdag",
+        renderer,
+        position_key(board),
+        ",".join(requested_layers),
+        ",".join(requested_types),
+    )
+    headers = {"ETag": etag, "Cache-Control": GRAPHDAG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    edges = await graph_executor.run(
+        position_acyclic_edges, board, requested_layers, requested_types
     )
-    stdout, stderr = process.communicate(input="\n".join(formatted_edges))
-    if process.returncode != 0:
-        return {"error": "Error executing command", "stderr": stderr}
-    else:
-        return {"ascii_art": stdout}
+    try:
+        ascii_art = await render(request, renderer, edges)
+    except DiagonError as e:
+        return {"error": str(e), "stderr": e.stderr}
+    if ascii_art is None:
+        return Response(status_code=499)
+    return JSONResponse({"ascii_art": ascii_art}, headers=headers)
+
+
+@router.get("/graphdag/cache")
+async def graphdag_cache_stats(renderer: str = "diagon"):
+    cache = layered.layered_cache if renderer == "python" else diagon.diagon_cache
+    return cache.stats()
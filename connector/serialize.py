@@ -0,0 +1,132 @@
+import json
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from analysis import LAYERS, AnalysisContext
+
+# Every body produced here is byte-for-byte what FastAPI's JSONResponse would send
+# for the same dict (json.dumps with ensure_ascii=False, allow_nan=False and compact
+# separators), without the jsonable_encoder walk in front of it. The nodes and edges
+# of a position are encoded once and kept on its cached AnalysisContext.
+
+# Streamed multi-position responses carry one JSON record per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class Fragment(str):
+    """Already-encoded JSON, spliced into dumps output verbatim."""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    )
+
+
+def _contains_fragment(value: Any) -> bool:
+    if isinstance(value, Fragment):
+        return True
+    if isinstance(value, dict):
+        return any(_contains_fragment(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_contains_fragment(item) for item in value)
+    return False
+
+
+def _encode(value: Any, parts: List[str]) -> None:
+    if isinstance(value, Fragment):
+        parts.append(value)
+    elif not _contains_fragment(value):
+        parts.append(_dumps(value))
+    elif isinstance(value, dict):
+        separator = "{"
+        for key, item in value.items():
+            parts.append(separator + _dumps(key) + ":")
+            _encode(item, parts)
+            separator = ","
+        parts.append("}")
+    else:
+        separator = "["
+        for item in value:
+            parts.append(separator)
+            _encode(item, parts)
+            separator = ","
+        parts.append("]")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a response body exactly as JSONResponse would, splicing in Fragments."""
+    parts: List[str] = []
+    _encode(value, parts)
+    return "".join(parts).encode("utf-8")
+
+
+def _items(values: list) -> str:
+    # A list's encoded items without the surrounding brackets
+    return _dumps(values)[1:-1]
+
+
+def _derived(context: AnalysisContext, key: str, build: Callable[[], str]) -> str:
+    fragment = context.derived.get(key)
+    if fragment is None:
+        fragment = context.derived[key] = build()
+    return fragment
+
+
+def connections_fragment(
+    context: AnalysisContext, requested_layers: Iterable[str], heatmap: bool = False
+) -> Fragment:
+    """
+    Encode context.connections(requested_layers, heatmap) from per-position pieces.
+    The node list and each layer's edges are encoded on first use, so later requests
+    for the same position, whatever their layers, only join strings.
+    """
+    requested_layers = set(requested_layers)
+    nodes = [
+        _derived(
+            context,
+            "json:heatmap_nodes" if heatmap else "json:nodes",
+            lambda: _items(context.heatmap_nodes if heatmap else context.nodes),
+        )
+    ]
+    if "king_box" in requested_layers:
+        nodes.append(
+            _derived(context, "json:phantom_nodes", lambda: _items(context.king_box[1]))
+        )
+    edges = [
+        _derived(context, "json:" + layer, lambda: _items(context.layer_edges(layer)))
+        for layer in LAYERS
+        if layer in requested_layers
+    ]
+    return Fragment(
+        '{"nodes":['
+        + ",".join(filter(None, nodes))
+        + '],"edges":['
+        + ",".join(filter(None, edges))
+        + "]}"
+    )
+
+
+def rendered(func: Callable[..., Any], *args) -> bytes:
+    """Call func and encode its result; lets executors hand back ready-made bytes."""
+    return dumps(func(*args))
+
+
+def json_response(body: bytes, **kwargs) -> Response:
+    """Wrap bytes from dumps in a Response, bypassing FastAPI's jsonable_encoder."""
+    return Response(body, media_type="application/json", **kwargs)
+
+
+def rendered_line(func: Callable[..., Any], *args) -> bytes:
+    """rendered, as one newline-terminated NDJSON record."""
+    return dumps(func(*args)) + b"\n"
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+def ndjson_response(lines: AsyncIterator[bytes], **kwargs) -> StreamingResponse:
+    """Stream records from rendered_line as they are produced."""
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, **kwargs)
@@ -0,0 +1,174 @@
+"""
+Production launcher: a pre-forking uvicorn server.
+
+The parent imports the app (and with it the attack lookup tables), warms the
+position cache, freezes the GC and only then binds the port and forks the workers,
+so every worker shares those pages copy-on-write and the port answers nothing,
+/health included, until the cache is warm. Dead workers are replaced; SIGTERM or
+SIGINT stops them all.
+
+    python serve.py [--workers N] [--host HOST] [--port PORT]
+
+Defaults come from CONNECTOR_WORKERS (or Heroku's WEB_CONCURRENCY, else the CPU
+count capped by any cgroup CPU quota), HOST (0.0.0.0) and PORT (8000). Needs
+fork(), so Linux or macOS only.
+"""
+
+import argparse
+import gc
+import importlib.util
+import logging
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+logger = logging.getLogger("connector.serve")
+
+# Workers dying faster than this are not replaced, so a broken build fails loudly
+# instead of fork-looping
+MIN_WORKER_LIFETIME = 1.0
+
+
+def available_cpus() -> int:
+    """CPU count, capped by a cgroup v2 CPU quota such as an ECS task's 'cpus'."""
+    cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        return cpus
+    if quota == "max":
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+def default_workers() -> int:
+    workers = os.environ.get("CONNECTOR_WORKERS") or os.environ.get("WEB_CONCURRENCY")
+    return int(workers) if workers else available_cpus()
+
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(config: uvicorn.Config, sock: socket.socket) -> None:
+    """Serve on the inherited socket until told to stop; never returns."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    status = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        logger.exception("Worker %d crashed", os.getpid())
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def spawn(config: uvicorn.Config, sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        run_worker(config, sock)
+    return pid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the connector with N workers")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+
+    # Preload: everything imported and cached here is shared with the workers
+    started = time.perf_counter()
+    from main import app
+    from warmup import WARMUP_ENABLED, warm_up
+
+    warmed = warm_up() if WARMUP_ENABLED else 0
+    # Objects that survive until the fork never move, so keep the collector from
+    # touching (and so copying) their pages in every worker
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "Preloaded app and %d positions in %.0f ms",
+        warmed,
+        (time.perf_counter() - started) * 1000,
+    )
+
+    config = uvicorn.Config(
+        app,
+        loop=event_loop(),
+        http=http_protocol(),
+        lifespan="on",
+        timeout_graceful_shutdown=10,
+    )
+    sock = bind(args.host, args.port)
+    logger.info(
+        "Listening on %s:%d with %d workers (%s, %s)",
+        args.host,
+        args.port,
+        args.workers,
+        config.loop,
+        config.http,
+    )
+
+    workers: Dict[int, float] = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        workers[spawn(config, sock)] = time.monotonic()
+
+    status = 0
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        lifetime = time.monotonic() - workers.pop(pid)
+        if stopping:
+            continue
+        if lifetime < MIN_WORKER_LIFETIME:
+            logger.error("Worker %d exited during startup; shutting down", pid)
+            status = 1
+            stop(signal.SIGTERM, None)
+            continue
+        logger.warning("Worker %d exited; starting a replacement", pid)
+        workers[spawn(config, sock)] = time.monotonic()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import random
+
+import chess
+import networkx as nx
+from analysis import LAYERS, AnalysisContext
+from test_attacks import MIDDLEGAME_FENS, random_positions
+from utils import build_acyclic_graph
+
+
+def reference_acyclic_graph(edges):
+    DG = nx.DiGraph()
+    for edge in edges:
+        DG.add_edge(edge["source"], edge["target"])
+        if not nx.is_directed_acyclic_graph(DG):
+            DG.remove_edge(edge["source"], edge["target"])
+    return DG
+
+
+def random_edges(nodes, count, rng):
+    return [
+        {"source": rng.choice(nodes), "target": rng.choice(nodes)} for _ in range(count)
+    ]
+
+
+def assert_same_graph(edges):
+    expected = reference_acyclic_graph(edges)
+    actual = build_acyclic_graph(edges)
+    assert actual.nodes == list(expected.nodes)
+    assert list(actual.edges()) == sorted(
+        expected.edges, key=lambda edge: (actual.index[edge[0]], actual.index[edge[1]])
+    )
+    assert actual.is_acyclic()
+
+
+def test_build_acyclic_graph_matches_reference_on_random_edges():
+    rng = random.Random(0)
+    for node_count in (2, 5, 16, 64):
+        nodes = chess.SQUARE_NAMES[:node_count]
+        for _ in range(20):
+            assert_same_graph(random_edges(nodes, node_count * 4, rng))
+
+
+def test_build_acyclic_graph_matches_reference_on_positions():
+    boards = [chess.Board(fen) for fen in MIDDLEGAME_FENS] + random_positions(20)
+    for board in boards:
+        assert_same_graph(AnalysisContext(board).connections(LAYERS)["edges"])
+
+
+def test_build_acyclic_graph_skips_self_loops_and_duplicates():
+    edges = [
+        {"source": "a", "target": "a"},
+        {"source": "a", "target": "b"},
+        {"source": "a", "target": "b"},
+        {"source": "b", "target": "a"},
+    ]
+    graph = build_acyclic_graph(edges)
+    assert graph.nodes == ["a", "b"]
+    assert list(graph.edges()) == [("a", "b")]
@@ -0,0 +1,113 @@
+import chess
+from fastapi.testclient import TestClient
+from main import app
+from analysis import AnalysisContext, parse_layers
+from test_attacks import (
+    MIDDLEGAME_FENS,
+    random_positions,
+    reference_edges,
+    reference_king_box_edges,
+    reference_shadow_edges,
+)
+
+client = TestClient(app)
+
+
+def reference_nodes(board, heatmap=False):
+    nodes = []
+    for square in chess.SQUARES:
+        piece = board.piece_at(square)
+        if piece:
+            node = {
+                "square": chess.square_name(square),
+                "piece_type": piece.symbol(),
+                "color": "white" if piece.color else "black",
+            }
+        elif heatmap:
+            node = {
+                "square": chess.square_name(square),
+                "piece_type": None,
+                "color": None,
+            }
+        else:
+            continue
+        if heatmap:
+            node["hw"] = len(board.attackers(chess.WHITE, square))
+            node["hb"] = len(board.attackers(chess.BLACK, square))
+        nodes.append(node)
+    return nodes
+
+
+def reference_adjacency_edges(board):
+    edges = []
+    for square in chess.SQUARES:
+        if not board.piece_at(square):
+            continue
+        for rank_offset in [-1, 0, 1]:
+            for file_offset in [-1, 0, 1]:
+                rank = chess.square_rank(square) + rank_offset
+                file = chess.square_file(square) + file_offset
+                if (rank_offset, file_offset) == (0, 0) or not (
+                    0 <= rank <= 7 and 0 <= file <= 7
+                ):
+                    continue
+                if board.piece_at(chess.square(file, rank)):
+                    edges.append(
+                        {
+                            "type": "adjacency",
+                            "source": chess.square_name(square),
+                            "target": chess.square_name(chess.square(file, rank)),
+                        }
+                    )
+    return edges
+
+
+def reference_connections(board, heatmap=False):
+    king_box_edges, phantom_nodes = reference_king_box_edges(board)
+    return {
+        "nodes": reference_nodes(board, heatmap) + phantom_nodes,
+        "edges": reference_adjacency_edges(board)
+        + reference_edges(board)
+        + king_box_edges
+        + reference_shadow_edges(board),
+    }
+
+
+def test_parse_layers():
+    assert parse_layers("all") == {"adjacencies", "links", "king_box", "shadows"}
+    assert parse_layers("none") == set()
+    assert parse_layers(" ") == set()
+    assert parse_layers("links, shadows") == {"links", "shadows"}
+
+
+def test_context_matches_reference():
+    boards = [chess.Board(fen) for fen in MIDDLEGAME_FENS] + random_positions(100)
+    for board in boards:
+        context = AnalysisContext(board)
+        for heatmap in (False, True):
+            assert context.connections(parse_layers("all"), heatmap) == (
+                reference_connections(board, heatmap)
+            ), board.fen()
+
+
+def test_context_layers_are_computed_once():
+    context = AnalysisContext(chess.Board())
+    assert context.link_edges is context.link_edges
+    assert context.attackers is context.attackers
+    body = context.connections({"king_box"})
+    body["nodes"].append({})
+    assert {} not in context.connections({"king_box"})["nodes"]
+
+
+def test_connections_all_layers_with_heatmap():
+    fen = MIDDLEGAME_FENS[1]
+    response = client.get(
+        "/connections/", params={"fen_string": fen, "layers": "all", "heatmap": True}
+    )
+    assert response.status_code == 200
+    assert response.json() == reference_connections(chess.Board(fen), heatmap=True)
+
+
+def test_connections_invalid_fen():
+    response = client.get("/connections/", params={"fen_string": "not a fen"})
+    assert response.json() == {"error": "Invalid FEN string"}
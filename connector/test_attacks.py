@@ -0,0 +1,200 @@
+import random
+
+import chess
+from fastapi.testclient import TestClient
+from main import app
+from attacks import RAYS
+from utils import get_edges
+from routers.connections import get_king_box_edges, get_shadow_edges
+
+client = TestClient(app)
+
+MIDDLEGAME_FENS = [
+    "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "2q1k3/3n1pp1/2N4p/3p4/Q2Pn3/5N1P/5PPK/8 b - - 9 31",
+]
+
+
+def reference_edges(board):
+    """The square-by-square board.attackers() scan get_edges replaced."""
+    edges = []
+    for square in chess.SQUARES:
+        piece = board.piece_at(square)
+        if piece:
+            for attacker_square in board.attackers(not piece.color, square):
+                edges.append(
+                    {
+                        "type": "threat",
+                        "source": chess.square_name(attacker_square),
+                        "target": chess.square_name(square),
+                    }
+                )
+            for defender_square in board.attackers(piece.color, square):
+                edges.append(
+                    {
+                        "type": "protection",
+                        "source": chess.square_name(defender_square),
+                        "target": chess.square_name(square),
+                    }
+                )
+    return edges
+
+
+def reference_shadow_edges(board):
+    """The square-by-square ray walk get_shadow_edges replaced."""
+    rook_directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+    bishop_directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    directions_by_type = {
+        chess.QUEEN: rook_directions + bishop_directions,
+        chess.ROOK: rook_directions,
+        chess.BISHOP: bishop_directions,
+    }
+    shadows = []
+    for square in chess.SQUARES:
+        piece = board.piece_at(square)
+        if piece is None or piece.piece_type not in directions_by_type:
+            continue
+        for d_file, d_rank in directions_by_type[piece.piece_type]:
+            pieces = []
+            file = chess.square_file(square) + d_file
+            rank = chess.square_rank(square) + d_rank
+            while 0 <= file <= 7 and 0 <= rank <= 7:
+                ray_piece = board.piece_at(chess.square(file, rank))
+                if ray_piece:
+                    pieces.append((chess.square(file, rank), ray_piece))
+                file += d_file
+                rank += d_rank
+            if len(pieces) >= 2:
+                (blocker_square, blocker), (target_square, target) = pieces[:2]
+                shadows.append(
+                    {
+                        "source": chess.square_name(square),
+                        "target": chess.square_name(blocker_square),
+                        "type": (
+                            "caster_protection"
+                            if piece.color == blocker.color
+                            else "caster_threat"
+                        ),
+                    }
+                )
+                shadows.append(
+                    {
+                        "source": chess.square_name(blocker_square),
+                        "target": chess.square_name(target_square),
+                        "type": (
+                            "shadow_protection"
+                            if piece.color == target.color
+                            else "shadow_threat"
+                        ),
+                    }
+                )
+    return shadows
+
+
+def reference_king_box_edges(board):
+    """The board.copy() per empty square get_king_box_edges replaced."""
+    edges = []
+    phantom_nodes = []
+    for color in [chess.WHITE, chess.BLACK]:
+        king_square = board.king(color)
+        if not king_square:
+            continue
+        king_file = chess.square_file(king_square)
+        king_rank = chess.square_rank(king_square)
+        for file_offset in [-1, 0, 1]:
+            for rank_offset in [-1, 0, 1]:
+                new_file = king_file + file_offset
+                new_rank = king_rank + rank_offset
+                if (file_offset, rank_offset) == (0, 0) or not (
+                    0 <= new_file <= 7 and 0 <= new_rank <= 7
+                ):
+                    continue
+                target_square = chess.square(new_file, new_rank)
+                piece = board.piece_at(target_square)
+                if piece:
+                    edge_type = (
+                        "king_blocked_ally"
+                        if piece.color == color
+                        else "king_blocked_threat"
+                    )
+                else:
+                    temp_board = board.copy()
+                    temp_board.set_piece_at(king_square, None)
+                    temp_board.set_piece_at(
+                        target_square, chess.Piece(chess.KING, color)
+                    )
+                    if temp_board.is_attacked_by(not color, target_square):
+                        edge_type = "king_blocked_threat"
+                    else:
+                        edge_type = "king_can_move"
+                        phantom_nodes.append(
+                            {
+                                "square": chess.square_name(target_square),
+                                "piece_type": "phantom",
+                                "color": "phantom",
+                            }
+                        )
+                edges.append(
+                    {
+                        "type": edge_type,
+                        "source": chess.square_name(king_square),
+                        "target": chess.square_name(target_square),
+                    }
+                )
+    return edges, phantom_nodes
+
+
+def random_positions(count, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = chess.Board()
+        for _ in range(rng.randint(0, 80)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+
+def test_get_edges_matches_reference():
+    boards = [chess.Board(fen) for fen in MIDDLEGAME_FENS] + random_positions(200)
+    for board in boards:
+        assert get_edges(board) == reference_edges(board), board.fen()
+
+
+def test_get_shadow_edges_matches_reference():
+    boards = [chess.Board(fen) for fen in MIDDLEGAME_FENS] + random_positions(200)
+    for board in boards:
+        assert get_shadow_edges(board) == reference_shadow_edges(board), board.fen()
+
+
+def test_get_king_box_edges_matches_reference():
+    fens = MIDDLEGAME_FENS + [
+        "rnbq1bnr/pppppppp/5k2/8/5K2/8/PPPPPPPP/RNBQ1BNR w KQkq - 0 1",
+        "rnb1kbnr/pppp1ppp/4p3/8/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+        "rnb4N/ppppk1pQ/8/2b5/2B5/8/PPP2nPP/RN4RK w - - 1 14",
+        "8/b7/4b3/6kp/3qBQ2/5K2/8/8 b - - 1 6",
+        # rook x-rays through the king's own square
+        "8/8/8/8/r3K3/8/8/7k w - - 0 1",
+    ]
+    boards = [chess.Board(fen) for fen in fens] + random_positions(200)
+    for board in boards:
+        assert get_king_box_edges(board) == reference_king_box_edges(board), board.fen()
+
+
+def test_ray_tables_exclude_origin_and_stop_at_edge():
+    assert RAYS[chess.A1][(1, 1)] == chess.BB_DIAG_ATTACKS[chess.A1][0]
+    assert RAYS[chess.H8][(1, 1)] == 0
+    assert RAYS[chess.D4][(0, -1)] == chess.BB_D1 | chess.BB_D2 | chess.BB_D3
+
+
+def test_connections_links_layer():
+    fen = MIDDLEGAME_FENS[0]
+    response = client.get(
+        "/connections/", params={"fen_string": fen, "layers": "links"}
+    )
+    assert response.status_code == 200
+    assert response.json()["edges"] == reference_edges(chess.Board(fen))
@@ -0,0 +1,69 @@
+import json
+
+from fastapi.testclient import TestClient
+from main import app
+from routers.connections import MAX_BATCH_SIZE
+
+client = TestClient(app)
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+
+def single(fen, **params):
+    return client.get("/connections/", params={"fen_string": fen, **params}).json()
+
+
+def test_batch_matches_single_requests_in_order():
+    response = client.post(
+        "/connections/batch",
+        json={"fens": [AFTER_E4, START], "layers": "links", "heatmap": True},
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results == [
+        single(AFTER_E4, layers="links", heatmap=True),
+        single(START, layers="links", heatmap=True),
+    ]
+
+
+def test_batch_reports_errors_per_item():
+    response = client.post(
+        "/connections/batch", json={"fens": [START, "bad fen", START]}
+    )
+    results = response.json()["results"]
+    assert results[1] == {"error": "Invalid FEN string"}
+    assert results[0] == results[2] == single(START)
+
+
+def test_batch_defaults_to_all_layers():
+    results = client.post("/connections/batch", json={"fens": [START]}).json()[
+        "results"
+    ]
+    assert results == [single(START, layers="all")]
+
+
+def ndjson_records(response):
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "Accept" in response.headers["vary"]
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_streams_one_line_per_fen():
+    fens = [AFTER_E4, "bad fen", START, AFTER_E4]
+    payload = {"fens": fens, "layers": "links", "heatmap": True}
+    buffered = client.post("/connections/batch", json=payload).json()["results"]
+    response = client.post(
+        "/connections/batch", json=payload, headers={"Accept": "application/x-ndjson"}
+    )
+    assert ndjson_records(response) == buffered
+
+
+def test_batch_stream_rejects_oversized_batch_up_front():
+    response = client.post(
+        "/connections/batch",
+        json={"fens": [START] * (MAX_BATCH_SIZE + 1)},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.headers["content-type"] == "application/json"
+    assert "error" in response.json()
@@ -0,0 +1,53 @@
+import random
+
+import chess
+import networkx as nx
+import pytest
+from bitgraph import BitGraph
+
+
+def random_graph(node_count, edge_count, seed):
+    rng = random.Random(seed)
+    nodes = chess.SQUARE_NAMES[:node_count]
+    edges = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(edge_count)]
+    return BitGraph(edges), nx.DiGraph(edges)
+
+
+def test_degrees_and_neighbours_match_networkx():
+    for seed in range(5):
+        graph, reference = random_graph(64, 300, seed)
+        assert graph.number_of_edges() == reference.number_of_edges()
+        assert set(graph.edges()) == set(reference.edges)
+        for node in reference.nodes:
+            assert graph.out_degree(node) == reference.out_degree(node)
+            assert graph.in_degree(node) == reference.in_degree(node)
+            assert set(graph.successors(node)) == set(reference.successors(node))
+            assert set(graph.predecessors(node)) == set(reference.predecessors(node))
+
+
+def test_reachability_and_closure_match_networkx():
+    for seed in range(5):
+        graph, reference = random_graph(32, 40, seed)
+        closure = graph.transitive_closure()
+        for node in reference.nodes:
+            descendants = nx.descendants(reference, node)
+            assert set(graph.descendants(node)) == descendants
+            assert set(graph.ancestors(node)) == nx.ancestors(reference, node)
+            expected = set(reference.successors(node)) | descendants
+            if any(node in cycle for cycle in nx.simple_cycles(reference)):
+                expected.add(node)
+            assert set(graph.labels(closure[graph.index[node]])) == expected
+
+
+def test_topological_sort_and_cycle_check():
+    graph = BitGraph([("e4", "d5"), ("c3", "e4"), ("c3", "d5")])
+    assert graph.topological_sort() == ["c3", "e4", "d5"]
+    assert graph.is_acyclic()
+    assert graph.has_path("c3", "d5") and not graph.has_path("d5", "c3")
+    graph.add_edge("d5", "c3")
+    assert not graph.is_acyclic()
+    with pytest.raises(ValueError):
+        graph.topological_sort()
+    graph.remove_edge("d5", "c3")
+    assert not graph.has_edge("d5", "c3")
+    assert graph.is_acyclic()
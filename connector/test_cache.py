@@ -0,0 +1,70 @@
+import chess
+from fastapi.testclient import TestClient
+from main import app
+from analysis import context_cache, get_context, position_key
+from cache import LRUCache
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_ttl_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=4, ttl=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 9
+    assert cache.get("a") == 1
+    clock.now = 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_counts_hits_and_misses():
+    cache = LRUCache(maxsize=4)
+    assert cache.get_or_create("a", lambda: 1) == 1
+    assert cache.get_or_create("a", lambda: 2) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_position_key_ignores_move_counters_and_rights():
+    a = chess.Board("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    b = chess.Board("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR b - - 12 40")
+    assert position_key(a) == position_key(b)
+    context_cache.clear()
+    assert get_context(a) is get_context(b)
+
+
+def test_connections_reuses_cached_all_layers():
+    context_cache.clear()
+    fen = "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9"
+    full = client.get("/connections/", params={"fen_string": fen}).json()
+    links = client.get(
+        "/connections/",
+        params={"fen_string": fen.replace("3 9", "0 30"), "layers": "links"},
+    ).json()
+    assert links["nodes"] == [n for n in full["nodes"] if n["piece_type"] != "phantom"]
+    assert links["edges"] == [
+        e for e in full["edges"] if e["type"] in ("threat", "protection")
+    ]
+    stats = client.get("/connections/cache").json()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
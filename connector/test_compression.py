@@ -0,0 +1,93 @@
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from compression import negotiate_encoding
+from main import app
+
+client = TestClient(app)
+
+MIDDLEGAME = "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9"
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0, gzip;q=0.5", "gzip"),
+        ("*", "br"),
+        ("*;q=0, gzip", "gzip"),
+        ("deflate", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding, ("br", "gzip")) == expected
+    if expected == "br":
+        assert negotiate_encoding(accept_encoding, ("gzip",)) == "gzip"
+
+
+def raw_get(url, encoding, **params):
+    # Ask httpx for the bytes on the wire rather than the decoded body
+    with client.stream(
+        "GET", url, params=params, headers={"Accept-Encoding": encoding}
+    ) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def decompressor(encoding):
+    if encoding == "br":
+        return pytest.importorskip("brotli").decompress
+    return gzip.decompress
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_large_bodies_are_compressed_as_negotiated(encoding):
+    decompress = decompressor(encoding)
+    params = {"fen_string": MIDDLEGAME, "heatmap": True}
+    plain, identity = raw_get("/connections/", "identity", **params)
+    assert "content-encoding" not in plain.headers
+    response, body = raw_get("/connections/", encoding, **params)
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(body) < len(identity)
+    assert decompress(body) == identity
+    # The compressed bytes are a different representation of the same body
+    assert response.headers["etag"] == "W/" + plain.headers["etag"]
+
+
+def test_small_bodies_are_left_alone():
+    response, body = raw_get("/health", "gzip, br")
+    assert "content-encoding" not in response.headers
+    assert json.loads(body) == {"status": "healthy"}
+
+
+def test_weak_etag_revalidates():
+    params = {"fen_string": MIDDLEGAME}
+    first = client.get(
+        "/connections/", params=params, headers={"Accept-Encoding": "gzip"}
+    )
+    etag = first.headers["etag"]
+    assert etag.startswith("W/")
+    cached = client.get(
+        "/connections/",
+        params=params,
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert cached.status_code == 304
+
+
+def test_streamed_ndjson_is_compressed_per_record():
+    payload = {"moves": ["e4", "e5", "Nf3", "Nc6"], "layers": "all"}
+    headers = {"Accept": "application/x-ndjson", "Accept-Encoding": "gzip"}
+    with client.stream(
+        "POST", "/connections/game", json=payload, headers=headers
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    lines = gzip.decompress(raw).decode().splitlines()
+    assert [json.loads(line)["ply"] for line in lines] == [0, 1, 2, 3, 4]
@@ -0,0 +1,61 @@
+import importlib.util
+import os
+import sys
+
+import chess
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+pytest.importorskip("requests")
+
+client = TestClient(app)
+
+# The client lives in the Blender addon, whose package imports bpy; load its
+# services package on its own so the relative import of connector_wire works
+SERVICES = os.path.join(os.path.dirname(__file__), "..", "blender-renderer", "services")
+spec = importlib.util.spec_from_file_location(
+    "blender_services",
+    os.path.join(SERVICES, "__init__.py"),
+    submodule_search_locations=[SERVICES],
+)
+sys.modules["blender_services"] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sys.modules["blender_services"])
+from blender_services import connector_service  # noqa: E402
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Route the service's requests to the app and record their headers."""
+    requests = []
+
+    def get(url, params=None, headers=None):
+        requests.append(dict(headers or {}))
+        path = url.split("://", 1)[1].split("/", 1)[1]
+        return client.get("/" + path, params=params, headers=headers)
+
+    monkeypatch.setattr(connector_service.requests, "get", get)
+    monkeypatch.setattr(connector_service, "_response_caches", {})
+    return requests
+
+
+def test_immutable_responses_are_reused_across_services(sent):
+    # Operators build a fresh service for every render
+    first = connector_service.ConnectorService("http://testserver")
+    body = first.fetch_connections(chess.STARTING_FEN, "links")
+    again = connector_service.ConnectorService("http://testserver/")
+    assert again.fetch_connections(chess.STARTING_FEN, "links") == body
+    assert len(sent) == 1
+    other = connector_service.ConnectorService("http://elsewhere")
+    assert other._responses is not first._responses
+
+
+def test_revalidates_with_if_none_match(sent, monkeypatch):
+    monkeypatch.setattr("routers.diff.IMMUTABLE_CACHE_CONTROL", "no-cache")
+    after = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    for _ in range(2):
+        service = connector_service.ConnectorService("http://testserver")
+        moves = service.fetch_diff(chess.STARTING_FEN, after)
+        assert moves == [{"from_square": "e2", "to_square": "e4"}]
+    assert "If-None-Match" not in sent[0]
+    assert sent[1]["If-None-Match"].strip('"')
@@ -0,0 +1,223 @@
+import random
+from collections import Counter
+
+import chess
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+def connections(fen, layers="all"):
+    return client.get(
+        "/connections/", params={"fen_string": fen, "layers": layers}
+    ).json()
+
+
+def as_multiset(items):
+    return Counter(tuple(sorted(item.items())) for item in items)
+
+
+def apply_patch(items, patch):
+    patched = as_multiset(items)
+    patched.subtract(as_multiset(patch["removed"]))
+    patched.update(as_multiset(patch["added"]))
+    return +patched
+
+
+def test_diff_moves_only_by_default():
+    response = client.get(
+        "/diff",
+        params={
+            "from_fen": chess.STARTING_FEN,
+            "to_fen": "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1",
+        },
+    )
+    assert response.json() == {"moves": [{"from_square": "e2", "to_square": "e4"}]}
+
+
+def test_diff_castling_moves():
+    response = client.get(
+        "/diff",
+        params={
+            "from_fen": "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+            "to_fen": "r3k2r/8/8/8/8/8/8/R4RK1 b kq - 1 1",
+        },
+    )
+    assert response.json()["moves"] == [
+        {"from_square": "e1", "to_square": "g1"},
+        {"from_square": "h1", "to_square": "f1"},
+    ]
+
+
+def test_diff_patches_connections_graph():
+    rng = random.Random(1)
+    board = chess.Board()
+    for _ in range(60):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        from_fen = board.fen()
+        board.push(rng.choice(moves))
+        to_fen = board.fen()
+
+        body = client.get(
+            "/diff", params={"from_fen": from_fen, "to_fen": to_fen, "layers": "all"}
+        ).json()
+        before, after = connections(from_fen), connections(to_fen)
+        assert apply_patch(before["nodes"], body["nodes"]) == as_multiset(
+            after["nodes"]
+        )
+        patched_edges = Counter()
+        for layer_patch in body["edges"].values():
+            patched_edges.update(as_multiset(layer_patch["added"]))
+            patched_edges.subtract(as_multiset(layer_patch["removed"]))
+        expected = as_multiset(after["edges"])
+        expected.subtract(as_multiset(before["edges"]))
+        assert +patched_edges == +expected and -patched_edges == -expected, to_fen
+
+
+def test_diff_single_layer_is_small():
+    body = client.get(
+        "/diff",
+        params={
+            "from_fen": chess.STARTING_FEN,
+            "to_fen": "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1",
+            "layers": "links",
+        },
+    ).json()
+    assert list(body["edges"]) == ["links"]
+    removed = {(e["source"], e["target"]) for e in body["edges"]["links"]["removed"]}
+    added = {(e["source"], e["target"]) for e in body["edges"]["links"]["added"]}
+    assert ("e1", "e2") in removed and ("e1", "e2") not in added
+    assert ("f1", "e2") in removed
+    assert len(removed) + len(added) < len(
+        connections(chess.STARTING_FEN, "links")["edges"]
+    )
+
+
+def diff(from_fen, to_fen, **params):
+    return client.get(
+        "/diff", params={"from_fen": from_fen, "to_fen": to_fen, **params}
+    ).json()
+
+
+def test_diff_en_passant():
+    from_fen = "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2"
+    to_fen = "4k3/8/3P4/8/8/8/8/4K3 b - - 0 2"
+    expected = [{"from_square": "e5", "to_square": "d6"}]
+    assert diff(from_fen, to_fen)["moves"] == expected
+    assert diff(from_fen, to_fen, verify=True) == {"moves": expected, "verified": True}
+
+
+def test_diff_promotion_with_and_without_capture():
+    from_fen = "1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1"
+    push = "Qr2k3/8/8/8/8/8/8/4K3 b - - 0 1"
+    capture = "1Q2k3/8/8/8/8/8/8/4K3 b - - 0 1"
+    assert diff(from_fen, push)["moves"] == [{"from_square": "a7", "to_square": "a8"}]
+    assert diff(from_fen, capture)["moves"] == [
+        {"from_square": "a7", "to_square": "b8"}
+    ]
+    assert diff(from_fen, capture, verify=True)["verified"] is True
+
+
+def test_diff_pairs_only_promoting_pawns_with_other_pieces():
+    # A rook left behind must not take the pawn's arrival square
+    response = client.get(
+        "/diff",
+        params={
+            "from_fen": "8/8/8/8/8/2P5/8/7R w - - 0 1",
+            "to_fen": "8/8/8/8/8/8/1P6/8 w - - 0 1",
+        },
+    )
+    assert response.json()["moves"] == [{"from_square": "c3", "to_square": "b2"}]
+    response = client.get(
+        "/diff",
+        params={
+            "from_fen": "8/1P6/8/8/8/8/8/7R w - - 0 1",
+            "to_fen": "1Q6/8/8/8/8/8/8/R7 w - - 0 1",
+        },
+    )
+    assert response.json()["moves"] == [
+        {"from_square": "h1", "to_square": "a1"},
+        {"from_square": "b7", "to_square": "b8"},
+    ]
+    # Exact matches come first, even for pieces scanned after the pawn
+    response = client.get(
+        "/diff",
+        params={
+            "from_fen": "R7/1P6/8/8/8/8/8/8 w - - 0 1",
+            "to_fen": "2R5/8/8/8/8/8/8/8 w - - 0 1",
+        },
+    )
+    assert response.json()["moves"] == [{"from_square": "a8", "to_square": "c8"}]
+
+
+def test_diff_verified_queenside_castling():
+    body = diff(
+        "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+        "r3k2r/8/8/8/8/8/8/2KR3R b kq - 1 1",
+        verify=True,
+    )
+    assert body == {
+        "moves": [
+            {"from_square": "a1", "to_square": "d1"},
+            {"from_square": "e1", "to_square": "c1"},
+        ],
+        "verified": True,
+    }
+
+
+def test_diff_verify_falls_back_when_no_legal_move_matches():
+    body = diff(
+        chess.STARTING_FEN,
+        "rnbqkbnr/pppppppp/8/8/4P3/4P3/PPP2PPP/RNBQKBNR b KQkq - 0 1",
+        verify=True,
+    )
+    assert body["verified"] is False
+    assert body["moves"] == [
+        {"from_square": "d2", "to_square": "e3"},
+        {"from_square": "e2", "to_square": "e4"},
+    ]
+
+
+def test_diff_verified_matches_played_moves():
+    rng = random.Random(2)
+    board = chess.Board()
+    for _ in range(80):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        from_fen = board.fen()
+        board.push(move)
+        body = diff(from_fen, board.fen(), verify=True)
+        assert body["verified"] is True
+        assert {"from_square": move.uci()[:2], "to_square": move.uci()[2:4]} in body[
+            "moves"
+        ]
+
+
+def test_diff_revalidates_with_etag(monkeypatch):
+    after = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    params = {"from_fen": chess.STARTING_FEN, "to_fen": after, "layers": "links"}
+    first = client.get("/diff", params=params)
+    etag = first.headers["ETag"]
+    assert "immutable" in first.headers["Cache-Control"]
+
+    def fail(*args):
+        raise AssertionError("a 304 must not recompute the diff")
+
+    monkeypatch.setattr("routers.diff.diff_body", fail)
+    # Move counters and side to move do not change an unverified diff
+    same = {**params, "from_fen": chess.STARTING_FEN.replace(" 0 1", " 0 7")}
+    cached = client.get("/diff", params=same, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+    monkeypatch.undo()
+
+    for changed in ({"verify": True}, {"layers": "all"}, {"layers": None}):
+        other = client.get("/diff", params={**params, **changed})
+        assert other.headers["ETag"] != etag
+    assert "ETag" not in client.get("/diff", params={**params, "to_fen": "bad"}).headers
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+import chess
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from executor import CPUExecutor, ExecutorBusy, ExecutorTimeout, cpu_executor
+from routers.connections import connections_body
+
+client = TestClient(app)
+
+
+def test_thread_executor_runs_work_off_the_loop():
+    executor = CPUExecutor(kind="thread", workers=2, queue_depth=4, timeout=5)
+    loop_thread = threading.get_ident()
+    worker_thread = asyncio.run(executor.run(threading.get_ident))
+    executor.shutdown()
+    assert worker_thread != loop_thread
+
+
+def test_process_executor_computes_connections():
+    executor = CPUExecutor(kind="process", workers=1, queue_depth=4, timeout=30)
+    executor.start()
+    body = asyncio.run(
+        executor.run(connections_body, chess.STARTING_FEN, "links", False)
+    )
+    executor.shutdown()
+    assert body == connections_body(chess.STARTING_FEN, "links", False)
+
+
+def test_executor_rejects_work_beyond_queue_depth():
+    executor = CPUExecutor(kind="thread", workers=1, queue_depth=1, timeout=5)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorBusy):
+            await executor.run(lambda: None)
+        release.set()
+        await first
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    assert executor.pending == 0
+
+
+def test_executor_times_out():
+    executor = CPUExecutor(kind="thread", workers=1, queue_depth=2, timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(ExecutorTimeout):
+        asyncio.run(executor.run(release.wait))
+    release.set()
+    executor.shutdown()
+
+
+def test_timed_out_task_keeps_its_slot_until_it_finishes():
+    executor = CPUExecutor(kind="thread", workers=1, queue_depth=1, timeout=0.05)
+    release = threading.Event()
+
+    async def scenario():
+        with pytest.raises(ExecutorTimeout):
+            await executor.run(release.wait)
+        # The abandoned task still occupies the pool, so new work is refused
+        with pytest.raises(ExecutorBusy):
+            await executor.run(lambda: None)
+        release.set()
+        while executor.pending:
+            await asyncio.sleep(0.01)
+        assert await executor.run(lambda: 42) == 42
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    assert executor.pending == 0
+
+
+def test_busy_executor_returns_503(monkeypatch):
+    monkeypatch.setattr(cpu_executor, "queue_depth", 0)
+    response = client.get("/connections/", params={"fen_string": chess.STARTING_FEN})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert "error" in response.json()
@@ -0,0 +1,114 @@
+import json
+
+import chess
+from fastapi.testclient import TestClient
+from main import app
+from replay import movetext_tokens
+
+client = TestClient(app)
+
+
+def single(fen, **params):
+    return client.get("/connections/", params={"fen_string": fen, **params}).json()
+
+
+def test_movetext_tokens_strips_numbers_comments_and_results():
+    movetext = "1. e4 c5 2. Nf3!? {main line} d6 (2... e6) 3. d4 $1 cxd4 1-0"
+    assert movetext_tokens(movetext) == ["e4", "c5", "Nf3", "d6", "d4", "cxd4"]
+
+
+def test_game_from_uci_and_san_moves():
+    response = client.post(
+        "/connections/game", json={"moves": ["e2e4", "c5", "Nf3"], "layers": "links"}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["ply"] for r in results] == [0, 1, 2, 3]
+    assert [r["move"] for r in results] == [None, "e2e4", "c7c5", "g1f3"]
+    assert [r["san"] for r in results] == [None, "e4", "c5", "Nf3"]
+    for result in results:
+        expected = single(result["fen"], layers="links")
+        assert result["nodes"] == expected["nodes"]
+        assert result["edges"] == expected["edges"]
+
+
+def test_game_from_puzzle_pgn():
+    with open("../data/liChessPuzzle.json", "r") as f:
+        pgn = json.load(f)["game"]["pgn"]
+    results = client.post("/connections/game", json={"pgn": pgn}).json()["results"]
+    assert len(results) == len(pgn.split()) + 1
+    board = chess.Board()
+    for token in pgn.split():
+        board.push_san(token)
+    assert results[-1]["fen"] == board.fen()
+    assert results[-1]["edges"] == single(board.fen())["edges"]
+
+
+def test_game_from_pgn_with_tags_and_start_fen():
+    start = "8/8/8/8/8/8/4K3/k7 w - - 0 1"
+    response = client.post(
+        "/connections/game",
+        json={
+            "start_fen": start,
+            "pgn": '[Event "?"]\n\n1. Kd3 Kb2 *',
+            "layers": "none",
+        },
+    )
+    results = response.json()["results"]
+    assert [r["move"] for r in results] == [None, "e2d3", "a1b2"]
+
+
+def test_game_reports_illegal_move():
+    response = client.post("/connections/game", json={"moves": ["e4", "e4"]})
+    assert response.json() == {"error": "Illegal move at ply 2: e4"}
+
+
+def test_game_reports_invalid_start_fen():
+    response = client.post("/connections/game", json={"start_fen": "bad", "moves": []})
+    assert "error" in response.json()
+
+
+def test_game_length_limit_counts_the_start_position(monkeypatch):
+    monkeypatch.setattr("routers.connections.MAX_BATCH_SIZE", 4)
+    moves = ["e4", "e5", "Nf3", "Nc6"]
+    response = client.post("/connections/game", json={"moves": moves[:3]})
+    assert len(response.json()["results"]) == 4
+    response = client.post("/connections/game", json={"moves": moves})
+    assert response.json() == {"error": "Games are limited to 3 plies"}
+    response = client.post(
+        "/connections/game",
+        json={"moves": moves},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.json() == {"error": "Games are limited to 3 plies"}
+
+
+def stream_game(**payload):
+    response = client.post(
+        "/connections/game", json=payload, headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_game_streams_one_line_per_ply():
+    payload = {"pgn": "1. e4 c5 2. Nf3 d6 3. d4", "layers": "links,king_box"}
+    buffered = client.post("/connections/game", json=payload).json()["results"]
+    assert stream_game(**payload) == buffered
+
+
+def test_game_stream_ends_with_error_at_illegal_move():
+    records = stream_game(moves=["e4", "e5", "e4"])
+    assert [r.get("ply") for r in records[:3]] == [0, 1, 2]
+    assert records[3] == {"error": "Illegal move at ply 3: e4"}
+    assert len(records) == 4
+
+
+def test_game_stream_reports_invalid_start_fen_as_json():
+    response = client.post(
+        "/connections/game",
+        json={"start_fen": "bad", "moves": []},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.headers["content-type"] == "application/json"
+    assert "error" in response.json()
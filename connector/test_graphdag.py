@@ -0,0 +1,175 @@
+import asyncio
+import os
+import stat
+import sys
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+import diagon
+
+client = TestClient(app)
+
+EDGES = [
+    {"source": "e2", "target": "e4"},
+    {"source": "e4", "target": "d5"},
+    {"source": "d5", "target": "e2"},
+]
+
+
+def write_script(directory, body):
+    path = directory / "diagon"
+    path.write_text(f"#!{sys.executable}\n{body}")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+@pytest.fixture
+def fake_diagon(tmp_path, monkeypatch):
+    """Install a diagon stand-in that echoes its input and counts its runs."""
+    calls = tmp_path / "calls"
+    script = write_script(
+        tmp_path,
+        "import sys\n"
+        f"open({str(calls)!r}, 'a').write('x')\n"
+        "sys.stdout.write(sys.argv[1] + ':' + sys.stdin.read())\n",
+    )
+    monkeypatch.setattr(diagon, "DIAGON_BINARY", script)
+    diagon.diagon_cache.clear()
+    yield lambda: len(calls.read_text()) if calls.exists() else 0
+    diagon.diagon_cache.clear()
+
+
+def test_graphdag_sends_sorted_acyclic_edges(fake_diagon):
+    response = client.put("/graphdag", json={"edges": EDGES})
+    assert response.status_code == 200
+    assert response.json() == {"ascii_art": "GraphDAG:e2->e4\ne4->d5"}
+
+
+def test_graphdag_caches_identical_edge_sets(fake_diagon):
+    first = client.put("/graphdag", json={"edges": EDGES}).json()
+    reordered = client.put("/graphdag", json={"edges": EDGES[1::-1]}).json()
+    assert reordered == first
+    assert fake_diagon() == 1
+    client.put("/graphdag", json={"edges": EDGES[:1]})
+    assert fake_diagon() == 2
+    stats = client.get("/graphdag/cache").json()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_graphdag_reports_missing_binary(monkeypatch, tmp_path):
+    monkeypatch.setattr(diagon, "DIAGON_BINARY", str(tmp_path / "missing"))
+    diagon.diagon_cache.clear()
+    body = client.put("/graphdag", json={"edges": EDGES}).json()
+    assert body["error"].startswith("diagon binary not found")
+
+
+def test_graphdag_reports_unstartable_binary(monkeypatch, tmp_path):
+    script = tmp_path / "diagon"
+    script.write_text("not a program")
+    monkeypatch.setattr(diagon, "DIAGON_BINARY", str(script))
+    diagon.diagon_cache.clear()
+    response = client.put("/graphdag", json={"edges": EDGES})
+    assert response.status_code == 200
+    assert response.json()["error"] == "diagon could not start: Permission denied"
+
+
+def test_graphdag_reports_failures_and_timeouts(monkeypatch, tmp_path):
+    script = write_script(tmp_path, "import sys\nsys.exit('bad input')\n")
+    monkeypatch.setattr(diagon, "DIAGON_BINARY", script)
+    with pytest.raises(diagon.DiagonError) as failure:
+        asyncio.run(diagon.run_diagon("GraphDAG", "a->b"))
+    assert failure.value.stderr.strip() == "bad input"
+
+    script = write_script(tmp_path, "import time\ntime.sleep(5)\n")
+    monkeypatch.setattr(diagon, "DIAGON_BINARY", script)
+    with pytest.raises(diagon.DiagonError, match="timed out"):
+        asyncio.run(diagon.run_diagon("GraphDAG", "a->b", timeout=0.2))
+
+
+def test_cancelling_a_render_kills_diagon(monkeypatch, tmp_path):
+    pid_file = tmp_path / "pid"
+    script = write_script(
+        tmp_path,
+        "import os, time\n"
+        f"open({str(pid_file)!r}, 'w').write(str(os.getpid()))\n"
+        "time.sleep(30)\n",
+    )
+    monkeypatch.setattr(diagon, "DIAGON_BINARY", script)
+
+    async def scenario():
+        task = asyncio.ensure_future(diagon.run_diagon("GraphDAG", "a->b"))
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_graphdag_queues_then_rejects_with_retry_after(monkeypatch, tmp_path):
+    script = write_script(tmp_path, "import time\ntime.sleep(1)\n")
+    monkeypatch.setattr(diagon, "DIAGON_BINARY", script)
+    monkeypatch.setattr(diagon, "DIAGON_CONCURRENCY", 1)
+    monkeypatch.setattr(diagon, "DIAGON_QUEUE_TIMEOUT", 0.2)
+    diagon.diagon_cache.clear()
+    responses = []
+    with TestClient(app) as shared_client:
+
+        def request(edges):
+            responses.append(shared_client.put("/graphdag", json={"edges": edges}))
+
+        threads = [
+            threading.Thread(target=request, args=([edge],)) for edge in EDGES[:2]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 503]
+    rejected = next(response for response in responses if response.status_code == 503)
+    assert rejected.headers["Retry-After"] == "1"
+
+
+def test_get_graphdag_matches_put_of_filtered_connections(fake_diagon):
+    fen = "r1bq1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 9"
+    params = {"fen_string": fen, "layers": "links", "edge_types": "protection"}
+    edges = client.get("/connections/", params={"fen_string": fen, "layers": "links"})
+    protection = [e for e in edges.json()["edges"] if e["type"] == "protection"]
+    for renderer in ("diagon", "python"):
+        response = client.get("/graphdag", params={**params, "renderer": renderer})
+        put = client.put("/graphdag", json={"edges": protection, "renderer": renderer})
+        assert response.status_code == 200
+        assert response.json() == put.json()
+        assert "ascii_art" in response.json()
+
+
+def test_get_graphdag_revalidates_with_etag(fake_diagon):
+    params = {"fen_string": "8/8/8/8/8/8/8/K6k w - - 0 1", "renderer": "python"}
+    first = client.get("/graphdag", params=params)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("public")
+    # Side to move and move counters do not change the drawing
+    same = {**params, "fen_string": "8/8/8/8/8/8/8/K6k b - - 5 40"}
+    cached = client.get("/graphdag", params=same, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    other = client.get("/graphdag", params={**params, "layers": "links"})
+    assert other.headers["ETag"] != etag
+
+
+def test_get_graphdag_rejects_bad_input():
+    assert client.get("/graphdag", params={"fen_string": "bad"}).json() == {
+        "error": "Invalid FEN string"
+    }
+    body = client.get(
+        "/graphdag",
+        params={"fen_string": "8/8/8/8/8/8/8/K6k w - - 0 1", "renderer": "x"},
+    ).json()
+    assert body["error"].startswith("Unknown renderer")
+    assert "ETag" not in client.get("/graphdag", params={"fen_string": "bad"}).headers
@@ -0,0 +1,97 @@
+import chess
+from fastapi.testclient import TestClient
+from main import app
+from analysis import LAYERS, AnalysisContext
+from layered import render_layered
+from test_attacks import MIDDLEGAME_FENS, random_positions
+from utils import build_acyclic_graph
+
+client = TestClient(app)
+
+
+def parse_boxes(art):
+    """Find every node box; returns {label: (top_row, left, right)}."""
+    grid = art.split("\n")
+    boxes = {}
+    for row, line in enumerate(grid[:-2]):
+        for left, char in enumerate(line):
+            if char != "┌":
+                continue
+            right = left + 1
+            while right < len(line) and line[right] in "─▽":
+                right += 1
+            if right < len(line) and line[right] == "┐" and grid[row + 1][left] == "│":
+                boxes[grid[row + 1][left + 1 : right].strip()] = (row, left, right)
+    return boxes
+
+
+def trace_edges(art):
+    """Follow every wire from a box's bottom port to the arrowhead it ends on."""
+    grid = [line.ljust(max(map(len, art.split("\n")))) for line in art.split("\n")]
+    boxes = parse_boxes(art)
+    by_top = {
+        (row, col): label
+        for label, (row, left, right) in boxes.items()
+        for col in range(left + 1, right)
+    }
+    edges = set()
+    for label, (row, left, right) in boxes.items():
+        for col in range(left + 1, right):
+            if grid[row + 2][col] != "┬":
+                continue
+            r, c, step = row + 3, col, (1, 0)
+            while True:
+                char = grid[r][c]
+                if step == (1, 0):
+                    if char == "▽":
+                        edges.add((label, by_top[r, c]))
+                        break
+                    step = {"│": (1, 0), "┘": (0, -1), "└": (0, 1)}[char]
+                else:
+                    if char in "┐┌":
+                        assert (char == "┐") == (step == (0, 1))
+                        step = (1, 0)
+                    else:
+                        assert char in "─│"
+                r, c = r + step[0], c + step[1]
+    return edges
+
+
+def dag_edges(board, layers):
+    return list(
+        build_acyclic_graph(AnalysisContext(board).connections(layers)["edges"]).edges()
+    )
+
+
+def test_layered_layers_match_diagon_sample():
+    with open("graphdag.txt") as f:
+        sample = parse_boxes(f.read().rstrip())
+    art = render_layered(dag_edges(chess.Board(), ["links"]))
+    boxes = parse_boxes(art)
+    assert set(boxes) == set(sample)
+    layer_rows = lambda parsed: sorted({row for row, _, _ in parsed.values()})
+    for label in sample:
+        assert layer_rows(boxes).index(boxes[label][0]) == layer_rows(sample).index(
+            sample[label][0]
+        )
+
+
+def test_layered_draws_every_edge():
+    boards = [chess.Board(), *map(chess.Board, MIDDLEGAME_FENS), *random_positions(10)]
+    for board in boards:
+        for layers in (["links"], LAYERS):
+            edges = dag_edges(board, layers)
+            assert trace_edges(render_layered(edges)) == set(edges)
+
+
+def test_layered_empty_graph():
+    assert render_layered([]) == ""
+
+
+def test_graphdag_selects_python_renderer():
+    edges = [{"source": "e2", "target": "e4"}, {"source": "e4", "target": "d5"}]
+    response = client.put("/graphdag", json={"edges": edges, "renderer": "python"})
+    assert response.status_code == 200
+    assert trace_edges(response.json()["ascii_art"]) == {("e2", "e4"), ("e4", "d5")}
+    bad = client.put("/graphdag", json={"edges": edges, "renderer": "dot"}).json()
+    assert "error" in bad
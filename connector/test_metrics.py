@@ -0,0 +1,121 @@
+import re
+import threading
+
+import chess
+from fastapi.testclient import TestClient
+from analysis import AnalysisContext
+from main import app
+from metrics import Counter, Gauge, Histogram, Registry
+
+client = TestClient(app)
+
+
+def sample(text, name, **labels):
+    """The value of one sample line in an exposition, or None if it is absent."""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = re.escape(name + ("{" + label_text + "}" if labels else "")) + r" (\S+)"
+    match = re.search("^" + pattern + "$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    histogram = registry.register(
+        Histogram("test_seconds", "A test histogram", ("kind",), buckets=(0.1, 1.0))
+    )
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.labels("a").observe(value)
+    text = registry.render()
+    assert (
+        "# HELP test_seconds A test histogram\n# TYPE test_seconds histogram\n" in text
+    )
+    # Buckets are cumulative and le is inclusive
+    assert sample(text, "test_seconds_bucket", kind="a", le="0.1") == 2
+    assert sample(text, "test_seconds_bucket", kind="a", le="1.0") == 3
+    assert sample(text, "test_seconds_bucket", kind="a", le="+Inf") == 4
+    assert sample(text, "test_seconds_count", kind="a") == 4
+    assert sample(text, "test_seconds_sum", kind="a") == 5.65
+
+
+def test_counter_rejects_wrong_labels():
+    counter = Counter("test_total", "A test counter", ("kind",))
+    try:
+        counter.labels("a", "b")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_gauges_are_set_by_callback_only():
+    registry = Registry()
+    gauge = registry.register(Gauge("test_depth", "A test gauge", ("queue",)))
+    assert not hasattr(gauge, "labels")
+    try:
+        gauge.set_function(lambda: 1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+    gauge.set_function(lambda: 3, "cpu")
+    assert sample(registry.render(), "test_depth", queue="cpu") == 3
+
+
+def test_recording_from_many_threads_is_not_lost():
+    registry = Registry()
+    counter = registry.register(Counter("test_total", "A test counter"))
+    histogram = registry.register(Histogram("test_seconds", "A test histogram"))
+
+    def record():
+        for _ in range(10000):
+            counter.inc()
+            histogram.observe(0.001)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    text = registry.render()
+    assert sample(text, "test_total") == 80000
+    assert sample(text, "test_seconds_count") == 80000
+
+
+def test_requests_are_labelled_by_route():
+    fen = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+    labels = {"method": "GET", "route": "/connections/", "status": "200"}
+    before = sample(
+        client.get("/metrics").text,
+        "connector_request_duration_seconds_count",
+        **labels,
+    )
+    assert client.get("/connections/", params={"fen_string": fen}).status_code == 200
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = sample(response.text, "connector_request_duration_seconds_count", **labels)
+    assert after == (before or 0) + 1
+    # Query strings never become labels
+    assert fen not in response.text
+
+
+def test_layer_compute_time_is_recorded_once_per_position():
+    def count(text, layer):
+        return sample(text, "connector_layer_compute_seconds_count", layer=layer) or 0
+
+    before = client.get("/metrics").text
+    context = AnalysisContext(chess.Board())
+    context.shadow_edges
+    context.shadow_edges
+    context.heatmap_nodes
+    after = client.get("/metrics").text
+    assert count(after, "shadows") == count(before, "shadows") + 1
+    assert count(after, "heatmap") == count(before, "heatmap") + 1
+
+
+def test_cache_and_executor_gauges():
+    text = client.get("/metrics").text
+    for cache in ("connections", "diagon", "layered"):
+        assert sample(text, "connector_cache_hits_total", cache=cache) is not None
+        assert 0 <= sample(text, "connector_cache_hit_ratio", cache=cache) <= 1
+    for executor in ("cpu", "graph"):
+        assert sample(text, "connector_executor_queue_depth", executor=executor) == 0
@@ -0,0 +1,81 @@
+import chess
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from analysis import LAYERS, AnalysisContext
+from routers.connections import connections_batch_body, connections_game_body
+from routers.diff import diff_body
+from serialize import connections_fragment, dumps
+from test_attacks import MIDDLEGAME_FENS, random_positions
+from wire import columnar_body
+
+
+def fastapi_bytes(body):
+    return JSONResponse(jsonable_encoder(body)).body
+
+
+def test_dumps_matches_jsonresponse_for_connections():
+    for board in [
+        chess.Board(),
+        *map(chess.Board, MIDDLEGAME_FENS),
+        *random_positions(20),
+    ]:
+        context = AnalysisContext(board)
+        for heatmap in (False, True):
+            for body in (
+                context.connections(LAYERS, heatmap),
+                context.connections({"links"}, heatmap),
+                columnar_body(context, LAYERS, heatmap),
+            ):
+                assert dumps(body) == fastapi_bytes(body)
+            for layers in (LAYERS, {"links"}, {"king_box"}, {"shadows"}, set()):
+                # Twice: first encoding the layers, then reusing the fragments
+                for _ in range(2):
+                    fragment = connections_fragment(context, layers, heatmap)
+                    body = context.connections(layers, heatmap)
+                    assert fragment.encode() == fastapi_bytes(body)
+
+
+def test_dumps_matches_jsonresponse_for_batch_game_and_diff():
+    fens = [chess.STARTING_FEN, "bad fen", *MIDDLEGAME_FENS, chess.STARTING_FEN]
+    for args in [
+        (fens, "all", True),
+        (fens, "links,king_box", False),
+        (["bad fen"] * 3, "all", False),
+    ]:
+        body = connections_batch_body(*args)
+        encoded = connections_batch_body(*args, encoded=True)
+        assert dumps(encoded) == fastapi_bytes(body)
+    for args in [
+        (chess.STARTING_FEN, ["e4", "e5", "Nf3"], None, "all", False),
+        (chess.STARTING_FEN, None, "e4 c5 Nf3 d6", "king_box", True),
+        (chess.STARTING_FEN, ["e4", "Ke7"], None, "all", False),
+    ]:
+        body = connections_game_body(*args)
+        encoded = connections_game_body(*args, encoded=True)
+        assert dumps(encoded) == fastapi_bytes(body)
+    bodies = []
+    after = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    for verify in (False, True):
+        for layers in (None, "all", "links"):
+            bodies.append(diff_body(chess.STARTING_FEN, after, verify, layers))
+    bodies.append(diff_body("bad", after, False, None))
+    for body in bodies:
+        assert dumps(body) == fastapi_bytes(body)
+
+
+def test_dumps_matches_json_dumps_for_odd_values():
+    odd = {
+        "text": 'quote " backslash \\ tab \t é ♞  ',
+        "numbers": [0, -1, 2**70, 1.5, 1e-7, True, False, None],
+        "empty": [{}, [], ""],
+        "tuple": ("e4", ("d5",)),
+        "edge_like": [
+            {"type": "custom", "source": "z9", "target": "e4"},
+            {"target": "e4", "type": "threat", "source": "d5"},
+        ],
+        "nested": {"a": {"b": {"c": []}}},
+    }
+    assert dumps(odd) == fastapi_bytes(odd)
+    with pytest.raises(ValueError):
+        dumps({"nan": float("nan")})
@@ -0,0 +1,30 @@
+import chess
+from fastapi.testclient import TestClient
+from analysis import context_cache, position_key
+from main import app
+from serve import default_workers
+from warmup import WARMUP_FENS, warm_up
+
+
+def test_warm_up_caches_every_preset_position():
+    assert warm_up() == len(WARMUP_FENS)
+    for fen in WARMUP_FENS:
+        context = context_cache.get(position_key(chess.Board(fen)))
+        assert context is not None
+        assert "json:links" in context.derived
+
+
+def test_startup_warms_before_serving():
+    context_cache.clear()
+    with TestClient(app) as client:
+        hits = context_cache.hits
+        client.get("/connections/", params={"fen_string": WARMUP_FENS[2]})
+        assert context_cache.hits == hits + 1
+
+
+def test_default_workers_prefers_explicit_settings(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.delenv("CONNECTOR_WORKERS", raising=False)
+    assert default_workers() == 3
+    monkeypatch.setenv("CONNECTOR_WORKERS", "5")
+    assert default_workers() == 5
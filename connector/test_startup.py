@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+
+def test_serving_does_not_import_plotting_libraries():
+    # Fresh interpreter, since the test session itself may have imported them
+    code = (
+        "import sys, main; "
+        "print(','.join(m for m in ('matplotlib', 'networkx', 'chess.pgn') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
@@ -0,0 +1,134 @@
+import importlib.util
+import os
+
+import chess
+from fastapi.testclient import TestClient
+from main import app
+from analysis import LAYERS, AnalysisContext
+from test_attacks import MIDDLEGAME_FENS, random_positions
+from wire import BINARY_MEDIA_TYPE, EDGE_TYPES, encode_graph
+
+client = TestClient(app)
+
+# The client-side decoder lives in the Blender addon; load it straight from its file
+spec = importlib.util.spec_from_file_location(
+    "connector_wire",
+    os.path.join(
+        os.path.dirname(__file__),
+        "..",
+        "blender-renderer",
+        "services",
+        "connector_wire.py",
+    ),
+)
+connector_wire = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(connector_wire)
+
+
+def test_client_decoder_tables_match():
+    assert connector_wire.EDGE_TYPES == EDGE_TYPES
+    assert connector_wire.SQUARE_NAMES == chess.SQUARE_NAMES
+
+
+def test_binary_round_trips_connections():
+    boards = [chess.Board(), *map(chess.Board, MIDDLEGAME_FENS), *random_positions(20)]
+    for board in boards:
+        for heatmap in (False, True):
+            body = AnalysisContext(board).connections(LAYERS, heatmap)
+            payload = encode_graph(body, heatmap)
+            assert connector_wire.decode_graph(payload) == body
+            assert len(payload) == 8 + len(body["nodes"]) * (
+                4 if heatmap else 2
+            ) + 3 * len(body["edges"])
+
+
+def test_connections_binary_negotiation():
+    params = {"fen_string": MIDDLEGAME_FENS[0], "heatmap": True}
+    expected = client.get("/connections/", params=params).json()
+    by_param = client.get("/connections/", params={**params, "format": "binary"})
+    by_accept = client.get(
+        "/connections/", params=params, headers={"Accept": BINARY_MEDIA_TYPE}
+    )
+    for response in (by_param, by_accept):
+        assert response.headers["content-type"] == BINARY_MEDIA_TYPE
+        assert "Accept" in response.headers["vary"]
+        assert connector_wire.decode_graph(response.content) == expected
+
+
+def test_connections_binary_errors_stay_json():
+    response = client.get(
+        "/connections/", params={"fen_string": "bad", "format": "binary"}
+    )
+    assert response.json() == {"error": "Invalid FEN string"}
+    response = client.get(
+        "/connections/", params={"fen_string": chess.STARTING_FEN, "format": "xml"}
+    )
+    assert response.json() == {"error": "Unknown format: xml"}
+
+
+def test_columnar_matches_flat_connections():
+    for fen in [chess.STARTING_FEN, *MIDDLEGAME_FENS]:
+        for layers in ("all", "links,king_box", "none"):
+            params = {"fen_string": fen, "layers": layers, "heatmap": True}
+            flat = client.get("/connections/", params=params).json()
+            data = client.get(
+                "/connections/", params={**params, "format": "columnar"}
+            ).json()
+            rows = connector_wire.columnar_rows(data["nodes"])
+            assert [
+                {key: value for key, value in row.items() if value is not None}
+                for row in rows
+            ] == [
+                {key: value for key, value in node.items() if value is not None}
+                for node in flat["nodes"]
+            ]
+            edges = [
+                edge
+                for layer in LAYERS
+                for edge in connector_wire.columnar_layer_edges(data, layer)
+            ]
+            assert edges == flat["edges"]
+            assert list(data["layers"]) == [
+                layer for layer in LAYERS if layers == "all" or layer in layers
+            ]
+
+
+def test_columnar_error_has_no_edges():
+    params = {"fen_string": "not a fen", "format": "columnar"}
+    data = client.get("/connections/", params=params).json()
+    assert "error" in data
+    assert connector_wire.columnar_layer_edges(data, "links") == []
+
+
+def test_etag_depends_on_format_and_skips_recomputation(monkeypatch):
+    params = {"fen_string": MIDDLEGAME_FENS[1], "layers": "links,shadows"}
+    etags = {
+        client.get(
+            "/connections/", params={**params, "format": response_format}
+        ).headers["ETag"]
+        for response_format in ("json", "binary", "columnar")
+    }
+    assert len(etags) == 3
+
+    by_accept = client.get(
+        "/connections/", params=params, headers={"Accept": BINARY_MEDIA_TYPE}
+    )
+    etag = by_accept.headers["ETag"]
+    assert "immutable" in by_accept.headers["Cache-Control"]
+
+    def fail(*args):
+        raise AssertionError("a 304 must not recompute the body")
+
+    monkeypatch.setattr("routers.connections.connections_encoded_body", fail)
+    # Same position and layers, spelled differently
+    same = {
+        "fen_string": MIDDLEGAME_FENS[1].replace(" w ", " b "),
+        "layers": "shadows,links",
+    }
+    cached = client.get(
+        "/connections/",
+        params={**same, "format": "binary"},
+        headers={"If-None-Match": f'"other", {etag}'},
+    )
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
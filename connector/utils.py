@@ -1,99 +1,61 @@
-import chess
-import networkx as nx
-import matplotlib.pyplot as plt
-from typing import List, Dict, Union
-from matplotlib.figure import Figure
+from typing import List, Dict
+from analysis import AnalysisContext
+from bitgraph import BitGraph
 
 
 def get_nodes(board, heatmap=False):
-    nodes = []
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            node = {
-                "square": chess.square_name(square),
-                "piece_type": piece.symbol(),
-                "color": "white" if piece.color else "black",
-            }
-        elif heatmap:
-            node = {
-                "square": chess.square_name(square),
-                "piece_type": None,
-                "color": None,
-            }
-        else:
-            continue
-        if heatmap:
-            node["hw"] = len(board.attackers(chess.WHITE, square))
-            node["hb"] = len(board.attackers(chess.BLACK, square))
-        nodes.append(node)
-    return nodes
+    context = AnalysisContext(board)
+    return list(context.heatmap_nodes if heatmap else context.nodes)
 
 
 def get_edges(board):
-    edges = []
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            attackers = board.attackers(not piece.color, square)
-            defenders = board.attackers(piece.color, square)
-
-            for attacker_square in attackers:
-                edges.append(
-                    {
-                        "type": "threat",
-                        "source": chess.square_name(attacker_square),
-                        "target": chess.square_name(square),
-                    }
-                )
-
-            for defender_square in defenders:
-                edges.append(
-                    {
-                        "type": "protection",
-                        "source": chess.square_name(defender_square),
-                        "target": chess.square_name(square),
-                    }
-                )
-    return edges
+    return list(AnalysisContext(board).link_edges)
 
 
-def build_acyclic_graph(edges: List[Dict[str, str]]) -> nx.DiGraph:
+def build_acyclic_graph(edges: List[Dict[str, str]]) -> BitGraph:
     """
     Build an acyclic directed graph by adding edges iteratively and skipping edges that would create a cycle.
     accepts edge data as a list of dictionaries with 'source' and 'target' keys
     returns an acyclic directed graph
+    Cycles are detected with the Pearce-Kelly online topological order: an edge that
+    already agrees with the order is accepted at once, otherwise only the nodes ranked
+    between its endpoints are searched and reordered.
     """
-    DG = nx.DiGraph()
+    graph = BitGraph()
+    order: List[int] = []  # node indices in topological order
+    rank: List[int] = []  # position of each node index within order
     for edge in edges:
-        DG.add_edge(edge["source"], edge["target"])
-        if not nx.is_directed_acyclic_graph(DG):
-            DG.remove_edge(edge["source"], edge["target"])
-    return DG
+        source = graph.add_node(edge["source"])
+        target = graph.add_node(edge["target"])
+        while len(rank) < len(graph):
+            rank.append(len(order))
+            order.append(len(order))
+        if source == target or graph.succ[source] >> target & 1:
+            # a self-loop is a cycle; a repeated edge leaves the graph unchanged
+            continue
+        if rank[source] < rank[target] or _reorder(graph, order, rank, source, target):
+            graph.add_edge(edge["source"], edge["target"])
+    return graph
 
 
-def visualize_graph(
-    edges: List[Dict[str, str]], is_directed: bool = True, output: str = "str"
-) -> Union[str, Figure]:
+def _reorder(graph: BitGraph, order, rank, source: int, target: int) -> bool:
     """
-    Visualize a graph in text form
-    Accepts as arguments:
-    - edges as a list of dictionaries with 'source' and 'target' keys
-    - is_directed as a boolean indicating whether the graph is directed
-    - output as a string 'str' or 'Figure'
-    returns a string representation of the graph
+    Make room in the topological order for an edge source -> target where target is
+    ranked before source; returns False, leaving the order untouched, if the edge closes a cycle
     """
-    if is_directed:
-        G = nx.DiGraph()
-    else:
-        G = nx.Graph()
-    for edge in edges:
-        G.add_edge(edge["source"], edge["target"])
-    if output == "str":
-        text_graph_lines = nx.readwrite.text.generate_network_text(G)
-        text_graph = "\n".join(text_graph_lines)
-        return text_graph
-    elif output == "Figure":
-        fig = plt.figure()
-        nx.draw(G, with_labels=True)
-        return plt
+    affected = order[rank[target] : rank[source] + 1]
+    window = 0
+    for index in affected:
+        window |= 1 << index
+    forward = graph.reachable(target, window)
+    if forward >> source & 1:
+        return False
+    backward = graph.reachable(source, window, reverse=True)
+    moved = [index for index in affected if backward >> index & 1] + [
+        index for index in affected if forward >> index & 1
+    ]
+    positions = sorted(rank[index] for index in moved)
+    for index, position in zip(moved, positions):
+        order[position] = index
+        rank[index] = position
+    return True
@@ -0,0 +1,34 @@
+import os
+import chess
+from typing import Iterable
+from analysis import LAYERS, get_context
+from serialize import connections_fragment
+
+# The preset positions every client offers first. Copied from SAMPLE_SETUPS in
+# blender-renderer/models.py (which mirrors ascii-chess-ts SetupOptions.ts); keep
+# the three in step.
+WARMUP_FENS = (
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbq1bnr/pppppppp/5k2/8/5K2/8/PPPPPPPP/RNBQ1BNR w KQkq - 0 1",
+    "rnb1kbnr/pppp1ppp/4p3/8/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+    "rnb4N/ppppk1pQ/8/2b5/2B5/8/PPP2nPP/RN4RK w - - 1 14",
+    "8/b7/4b3/6kp/3qBQ2/5K2/8/8 b - - 1 6",
+)
+
+# Set CONNECTOR_WARMUP=0 to skip warming (e.g. in tests of a cold cache)
+WARMUP_ENABLED = os.environ.get("CONNECTOR_WARMUP", "1") != "0"
+
+
+def warm_up(fens: Iterable[str] = WARMUP_FENS) -> int:
+    """
+    Analyse and encode every layer of fens, with and without heatmap data, so the
+    first requests for them are cache hits.
+    returns the number of positions warmed; cheap when they are already cached
+    """
+    count = 0
+    for fen in fens:
+        context = get_context(chess.Board(fen))
+        for heatmap in (False, True):
+            connections_fragment(context, LAYERS, heatmap)
+        count += 1
+    return count
@@ -0,0 +1,120 @@
+import struct
+from typing import Iterable, Optional
+
+import chess
+from analysis import LAYERS, AnalysisContext
+
+# Opt-in binary encoding of a /connections body. All integers are little-endian:
+#   header  magic b"CG", version u8, flags u8 (bit 0: heatmap), node count u16,
+#           edge count u16
+#   node    square u8 (0-63, a1=0 .. h8=63), piece code u8, then hw u8 and hb u8
+#           when the heatmap flag is set (0 for phantom nodes, which have none)
+#   edge    type code u8, source square u8, target square u8
+# The code tables below are append-only; blender-renderer/services/connector_wire.py
+# carries a copy for the client-side decoder.
+BINARY_MEDIA_TYPE = "application/vnd.connector.graph"
+MAGIC = b"CG"
+VERSION = 1
+FLAG_HEATMAP = 1
+HEADER = struct.Struct("<2sBBHH")
+
+EDGE_TYPES = (
+    "adjacency",
+    "threat",
+    "protection",
+    "king_can_move",
+    "king_blocked_ally",
+    "king_blocked_threat",
+    "caster_threat",
+    "caster_protection",
+    "shadow_threat",
+    "shadow_protection",
+)
+# Piece code 0 is an empty (heatmap-only) square, 1-6 white and 7-12 black pieces in
+# symbol order, 13 a phantom king-box node
+PIECE_SYMBOLS = "PNBRQKpnbrqk"
+PHANTOM = len(PIECE_SYMBOLS) + 1
+
+SQUARE_CODES = {name: square for square, name in enumerate(chess.SQUARE_NAMES)}
+TYPE_CODES = {edge_type: code for code, edge_type in enumerate(EDGE_TYPES)}
+PIECE_CODES = {(None, None): 0, ("phantom", "phantom"): PHANTOM}
+for code, symbol in enumerate(PIECE_SYMBOLS, start=1):
+    PIECE_CODES[symbol, "white" if symbol.isupper() else "black"] = code
+
+FORMATS = ("json", "binary", "columnar")
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """
+    Pick a response format from the 'format' query parameter or, failing that, the
+    Accept header; JSON unless the client opts in to something else.
+    """
+    if requested:
+        return requested
+    if accept and BINARY_MEDIA_TYPE in accept:
+        return "binary"
+    return "json"
+
+
+def encode_graph(body: dict, heatmap: bool = False) -> bytes:
+    """
+    Pack a /connections body into the binary layout described above.
+    accepts the nodes/edges dict and whether its nodes carry hw/hb heatmap counts
+    """
+    nodes, edges = body["nodes"], body["edges"]
+    codes = []
+    if heatmap:
+        for node in nodes:
+            codes += (
+                SQUARE_CODES[node["square"]],
+                PIECE_CODES[node["piece_type"], node["color"]],
+                node.get("hw", 0),
+                node.get("hb", 0),
+            )
+    else:
+        for node in nodes:
+            codes += (
+                SQUARE_CODES[node["square"]],
+                PIECE_CODES[node["piece_type"], node["color"]],
+            )
+    for edge in edges:
+        codes += (
+            TYPE_CODES[edge["type"]],
+            SQUARE_CODES[edge["source"]],
+            SQUARE_CODES[edge["target"]],
+        )
+    flags = FLAG_HEATMAP if heatmap else 0
+    return HEADER.pack(MAGIC, VERSION, flags, len(nodes), len(edges)) + bytes(codes)
+
+
+def columnar_body(
+    context: AnalysisContext, requested_layers: Iterable[str], heatmap: bool = False
+) -> dict:
+    """
+    Lay a /connections body out as parallel arrays.
+    Node fields become one array each (hw/hb are null for phantom nodes), and each
+    requested layer gets its own source/target/type_code arrays, type_code indexing
+    the edge_types list, so clients can take a layer without scanning every edge.
+    """
+    requested_layers = set(requested_layers)
+    nodes = list(context.heatmap_nodes if heatmap else context.nodes)
+    if "king_box" in requested_layers:
+        nodes += context.king_box[1]
+    columns = {
+        "square": [node["square"] for node in nodes],
+        "piece_type": [node["piece_type"] for node in nodes],
+        "color": [node["color"] for node in nodes],
+    }
+    if heatmap:
+        columns["hw"] = [node.get("hw") for node in nodes]
+        columns["hb"] = [node.get("hb") for node in nodes]
+    layers = {}
+    for layer in LAYERS:
+        if layer in requested_layers:
+            edges = context.layer_edges(layer)
+            layers[layer] = {
+                "source": [edge["source"] for edge in edges],
+                "target": [edge["target"] for edge in edges],
+                "type_code": [TYPE_CODES[edge["type"]] for edge in edges],
+            }
+    return {"nodes": columns, "edge_types": list(EDGE_TYPES), "layers": layers}